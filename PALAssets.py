@@ -0,0 +1,326 @@
+from PIL import Image, ImageFont
+import os
+import glob
+import threading
+from collections import OrderedDict
+
+"""
+Cache de recursos (fundo, shapes e fontes) compartilhado por todas as seções do processo.
+"""
+
+#   LIMITES PADRÃO DE MEMÓRIA (bytes de pixels decodificados)
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_TEMPLATE_MEMORY_LIMIT = 128 * 1024 * 1024
+
+# Quantos layouts vistos uma única vez são lembrados (um layout só vira template na segunda vez).
+TEMPLATE_SEEN_LIMIT = 4096
+
+
+#   TAMANHO DE UMA IMAGEM EM MEMÓRIA
+def _image_size(image):
+    return image.width * image.height * len(image.getbands())
+
+
+class _LRUImages:
+    """ Dicionário de imagens com limite de memória e descarte das menos usadas (LRU). """
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.memory_used = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        size = _image_size(image)
+        with self._lock:
+            if key in self._items:
+                return self._items[key]
+            self._items[key] = image
+            self.memory_used += size
+            # Descarta as entradas mais antigas, mas nunca a que acabou de entrar.
+            while self.memory_used > self.memory_limit and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.memory_used -= _image_size(old)
+            return image
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.memory_used = 0
+
+
+class AssetCache:
+
+    #  INICIALIZAÇÃO
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT,
+                 template_memory_limit=DEFAULT_TEMPLATE_MEMORY_LIMIT, atlas=None):
+        """
+        Inicializa o cache com um limite de memória (em bytes) para as imagens decodificadas.
+        Quando o limite é ultrapassado, as imagens menos usadas recentemente são descartadas.
+        Os layouts já compostos (templates) têm um limite separado, para não expulsar os shapes.
+        Com um atlas (PALAtlas.ShapeAtlas), as figuras presentes nele são lidas do arquivo
+        mapeado em memória, sem decodificar os PNGs.
+        """
+        self.atlas = atlas
+        self._images = _LRUImages(memory_limit)
+        self._templates = _LRUImages(template_memory_limit)
+        self._template_seen = OrderedDict()
+        self._fonts = {}
+        self._font_warnings = set()
+        self._offsets = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    @property
+    def memory_limit(self):
+        return self._images.memory_limit
+
+    @property
+    def memory_used(self):
+        return self._images.memory_used + self._templates.memory_used
+
+    #  LEITURA / ESCRITA COM LRU
+    def _get(self, key):
+        return self._images.get(key)
+
+    def _put(self, key, image):
+        return self._images.put(key, image)
+
+    #  ATLAS MAPEADO EM MEMÓRIA
+    def use_atlas(self, pasta, rebuild=True):
+        """
+        Passa a ler as figuras de `pasta` do atlas pré-decodificado (PALAtlas), gerando-o
+        de novo se alguma figura mudou. Com rebuild=False e o atlas ausente ou
+        desatualizado, continua decodificando os PNGs. Retorna o atlas (ou None).
+        """
+        from PALAtlas import open_atlas
+        atlas = open_atlas(pasta, rebuild=rebuild)
+        if atlas is not None:
+            # Descarta os shapes já decodificados dos PNGs: os do atlas não ocupam memória própria.
+            self._images.clear()
+        self.atlas = atlas
+        return atlas
+
+    def _from_atlas(self, path, flip=False):
+        return self.atlas.get(path, flip) if self.atlas is not None else None
+
+    #  CARREGA UMA IMAGEM EM RGBA
+    def _load_rgba(self, path):
+        image = self._from_atlas(path)
+        if image is not None:
+            return image
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Arquivo '{path}' não encontrado!")
+        with Image.open(path) as image:
+            return image.convert('RGBA')
+
+    #  SHAPES (ORIGINAL E ESPELHADO)
+    def get_shape(self, path, flip=False, scale=1.0):
+        """
+        Retorna o shape em RGBA, decodificado uma única vez por processo.
+        A versão espelhada (flip=True) também fica em cache.
+        Com scale != 1, retorna o shape redimensionado, também guardado em cache
+        (o atlas, quando usado, fornece só o shape original).
+        A imagem retornada é compartilhada e não deve ser modificada.
+        """
+        key = ("shape", os.path.normpath(path), bool(flip)) + _scale_key(scale)
+        image = self._get(key)
+        if image is not None:
+            return image
+        if scale != 1:
+            if flip:
+                image = self.get_shape(path, scale=scale).transpose(Image.FLIP_LEFT_RIGHT)
+            else:
+                image = scale_image(self.get_shape(path), scale)
+        elif flip:
+            image = self._from_atlas(path, flip=True)
+            if image is None:
+                image = self.get_shape(path).transpose(Image.FLIP_LEFT_RIGHT)
+        else:
+            image = self._load_rgba(path)
+        return self._put(key, image)
+
+    #  SHAPES RECORTADOS NA ÁREA VISÍVEL (RETÂNGULO SUJO)
+    def get_trimmed_shape(self, path, flip=False, scale=1.0):
+        """
+        Retorna (imagem, (dx, dy)): o shape recortado no retângulo onde o alfa não é
+        zero e o deslocamento desse recorte dentro do shape inteiro. Compor o recorte
+        em (x + dx, y + dy) gera exatamente os mesmos pixels que compor o shape inteiro
+        em (x, y), pois os pixels totalmente transparentes não alteram o fundo.
+        O recorte é calculado uma única vez; o espelhado é derivado dele.
+        """
+        key = ("trimmed", os.path.normpath(path), bool(flip)) + _scale_key(scale)
+        image = self._get(key)
+        if image is not None:
+            return image, self._offsets[key]
+        shape = self.get_shape(path, scale=scale)
+        if flip:
+            original, (dx, dy) = self.get_trimmed_shape(path, scale=scale)
+            if original is shape:
+                image = self.get_shape(path, flip=True, scale=scale)
+            else:
+                image = original.transpose(Image.FLIP_LEFT_RIGHT)
+            offset = (shape.width - (dx + original.width), dy)
+        else:
+            # Shape totalmente transparente: um pixel transparente mantém a composição válida.
+            bbox = shape.getchannel('A').getbbox() or (0, 0, 1, 1)
+            image = shape if bbox == (0, 0) + shape.size else shape.crop(bbox)
+            offset = bbox[:2]
+        with self._lock:
+            self._offsets[key] = offset
+        return self._put(key, image), offset
+
+    #  FUNDO (CÓPIA POR SEÇÃO)
+    def get_background(self, path, copy=True, scale=1.0):
+        """
+        Retorna uma cópia do fundo em RGBA, que pode ser desenhada livremente.
+        Com copy=False retorna a imagem compartilhada do cache (somente leitura).
+        Com scale != 1, o fundo redimensionado (também guardado em cache).
+        """
+        key = ("background", os.path.normpath(path)) + _scale_key(scale)
+        image = self._get(key)
+        if image is None:
+            if scale != 1:
+                image = self._put(key, scale_image(self.get_background(path, copy=False), scale))
+            else:
+                image = self._put(key, self._load_rgba(path))
+        return image.copy() if copy else image
+
+    #  LAYOUTS JÁ COMPOSTOS (TEMPLATES)
+    def get_template(self, key):
+        """
+        Retorna o canvas já composto para um layout (ou None). A imagem é
+        compartilhada: copie antes de desenhar sobre ela.
+        """
+        return self._templates.get(key)
+
+    def wants_template(self, key):
+        """
+        Indica se vale guardar o canvas deste layout: só a partir da segunda vez
+        que ele aparece, para que layouts únicos não paguem a cópia extra.
+        """
+        with self._lock:
+            if key in self._template_seen:
+                return True
+            self._template_seen[key] = None
+            if len(self._template_seen) > TEMPLATE_SEEN_LIMIT:
+                self._template_seen.popitem(last=False)
+            return False
+
+    def put_template(self, key, image):
+        return self._templates.put(key, image)
+
+    #  ETIQUETAS (SETA E NÚMERO) JÁ DESENHADAS
+    def get_label(self, key):
+        """
+        Retorna (máscara, (dx, dy)) da etiqueta identificada por `key`
+        (fonte, tamanho, texto, posição e largura da seta), ou None.
+        As etiquetas são poucas (números 1..N acima ou abaixo) e não são descartadas.
+        """
+        return self._labels.get(key)
+
+    def put_label(self, key, sprite):
+        with self._lock:
+            return self._labels.setdefault(key, sprite)
+
+    #  FONTES POR (CAMINHO, TAMANHO)
+    def get_font(self, path, size):
+        """
+        Retorna a fonte para (path, size), carregando-a apenas na primeira vez.
+        Se não for possível carregar a fonte, usa a padrão (e avisa uma única vez).
+        """
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+        if font is not None:
+            return font
+        font = None
+        if path:
+            try:
+                font = ImageFont.truetype(path, size)
+            except (IOError, OSError) as e:
+                # Um aviso por arquivo, mesmo quando pedido em vários tamanhos (escalas).
+                if path not in self._font_warnings:
+                    self._font_warnings.add(path)
+                    print(f"Aviso: Não foi possível carregar a fonte '{path}'. Usando a fonte padrão. Erro: {e}")
+        if font is None:
+            font = ImageFont.load_default()
+        with self._lock:
+            return self._fonts.setdefault(key, font)
+
+    #  PRÉ-CARREGAMENTO
+    def preload(self, paths, flips=(False, True), scale=1.0):
+        """
+        Decodifica antecipadamente uma lista de shapes (nas orientações e na escala pedidas).
+        Arquivos inexistentes são ignorados.
+        """
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            for flip in flips:
+                self.get_shape(path, flip, scale)
+
+    #  AQUECIMENTO COMPLETO
+    def warm(self, pasta, background_path, font_path=None, font_size=60, scale=1.0):
+        """
+        Deixa o cache pronto para renderizar: fundo, fonte e todos os shapes de `pasta`,
+        na escala pedida (font_size é o tamanho na escala 1).
+        Retorna o próprio cache, para ser reaproveitado entre requisições.
+        """
+        self.get_font(font_path, scaled_length(font_size, scale, minimum=1))
+        self.get_background(background_path, scale=scale)
+        fundo = os.path.normpath(background_path)
+        self.preload(sorted(p for p in glob.glob(os.path.join(pasta, "*.png"))
+                            if os.path.normpath(p) != fundo), scale=scale)
+        return self
+
+    def clear(self):
+        self._images.clear()
+        self._templates.clear()
+        with self._lock:
+            self._template_seen.clear()
+            self._fonts.clear()
+            self._font_warnings.clear()
+            self._labels.clear()
+
+
+#   ESCALA (PRÉVIAS EM RESOLUÇÃO REDUZIDA)
+def scaled_length(value, scale, minimum=None):
+    """
+    Converte uma medida em pixels da resolução original para a escala pedida.
+    Na escala 1 o valor é devolvido sem alteração.
+    """
+    if scale == 1:
+        return value
+    value = int(round(value * scale))
+    return value if minimum is None else max(minimum, value)
+
+
+def scale_image(image, scale):
+    """ Redimensiona a imagem (RGBA é filtrado com o alfa pré-multiplicado pelo Pillow). """
+    size = (scaled_length(image.width, scale, minimum=1), scaled_length(image.height, scale, minimum=1))
+    return image.resize(size, Image.LANCZOS)
+
+
+def _scale_key(scale):
+    # Escala 1 mantém as chaves originais do cache.
+    return () if scale == 1 else (float(scale),)
+
+
+#   CACHE COMPARTILHADO DO PROCESSO
+_default_cache = None
+
+
+def get_default_cache():
+    """ Retorna o cache compartilhado pelo processo (criado sob demanda). """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AssetCache()
+    return _default_cache
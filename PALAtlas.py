@@ -0,0 +1,187 @@
+from PIL import Image
+import os
+import json
+import mmap
+import struct
+import argparse
+
+"""
+Atlas de figuras pré-decodificadas: todos os PNGs de uma pasta (shapes e fundo), nas duas
+orientações, gravados em RGBA cru em um único arquivo. O arquivo é mapeado em memória (mmap)
+e as imagens são criadas diretamente sobre as páginas mapeadas, sem decodificar PNG; os
+processos que abrem o mesmo atlas compartilham essas páginas.
+
+Uso:
+    python -m PALAtlas build [--pasta figuras]
+    python -m PALAtlas check [--pasta figuras]
+"""
+
+#   FORMATO DO ARQUIVO
+#   [cabeçalho][índice JSON][preenchimento][pixels RGBA de cada entrada, alinhados]
+ATLAS_NAME = ".pal_atlas.bin"
+ATLAS_MAGIC = b"PALATLAS"
+ATLAS_VERSION = 1
+ALIGNMENT = 64
+_HEADER = struct.Struct("<8sIQ")  # assinatura, versão, tamanho do índice
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def atlas_path_for(pasta):
+    return os.path.join(pasta, ATLAS_NAME)
+
+
+def _entry_key(nome, flip):
+    return f"{nome}|{int(bool(flip))}"
+
+
+#   ASSINATURA DAS FIGURAS DE ORIGEM (nome -> [mtime, tamanho])
+def _sources(pasta):
+    fontes = {}
+    for nome in sorted(os.listdir(pasta)):
+        if nome.lower().endswith(".png"):
+            st = os.stat(os.path.join(pasta, nome))
+            fontes[nome] = [st.st_mtime_ns, st.st_size]
+    return fontes
+
+
+#   GERA O ATLAS
+def build_atlas(pasta, path=None):
+    """
+    Grava o atlas de `pasta` (por padrão em pasta/.pal_atlas.bin) e retorna o caminho.
+    As figuras são decodificadas uma de cada vez, e o arquivo é substituído de forma
+    atômica, para que outros processos nunca vejam um atlas pela metade.
+    """
+    path = path or atlas_path_for(pasta)
+    fontes = _sources(pasta)
+
+    # Primeira passada: só os cabeçalhos dos PNGs, para montar o índice.
+    entries = {}
+    offset = 0
+    for nome in fontes:
+        with Image.open(os.path.join(pasta, nome)) as image:
+            width, height = image.size
+        for flip in (False, True):
+            entries[_entry_key(nome, flip)] = {"offset": offset, "size": [width, height]}
+            offset += _align(width * height * 4)
+    index = json.dumps({"version": ATLAS_VERSION, "sources": fontes, "entries": entries}).encode('utf-8')
+    inicio_dados = _align(_HEADER.size + len(index))
+
+    temporario = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'wb') as f:
+            f.write(_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(index)))
+            f.write(index)
+            f.write(b"\0" * (inicio_dados - _HEADER.size - len(index)))
+            for nome in fontes:
+                with Image.open(os.path.join(pasta, nome)) as image:
+                    image = image.convert('RGBA')
+                for flip in (False, True):
+                    dados = (image.transpose(Image.FLIP_LEFT_RIGHT) if flip else image).tobytes()
+                    f.write(dados)
+                    f.write(b"\0" * (_align(len(dados)) - len(dados)))
+        os.replace(temporario, path)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return path
+
+
+class ShapeAtlas:
+    """
+    Atlas aberto com mmap. As imagens retornadas por get() apontam para as páginas
+    mapeadas: são somente leitura e não ocupam memória própria do processo.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, path):
+        self.path = path
+        self.pasta = os.path.dirname(os.path.abspath(path))
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Atlas '{path}' inválido.")
+        magic, version, tamanho_indice = _HEADER.unpack_from(self._mmap, 0)
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+            raise ValueError(f"Atlas '{path}' inválido ou de outra versão.")
+        index = json.loads(self._mmap[_HEADER.size:_HEADER.size + tamanho_indice])
+        self.sources = index["sources"]
+        self._entries = index["entries"]
+        self._data = _align(_HEADER.size + tamanho_indice)
+        self._view = memoryview(self._mmap)
+
+    #  O ATLAS CORRESPONDE ÀS FIGURAS ATUAIS?
+    def is_current(self):
+        try:
+            return self.sources == _sources(self.pasta)
+        except OSError:
+            return False
+
+    #  IMAGEM SOBRE O ARQUIVO MAPEADO
+    def get(self, path, flip=False):
+        """
+        Retorna a figura `path` (na orientação pedida) como imagem RGBA somente leitura,
+        ou None se ela não estiver no atlas.
+        """
+        if os.path.dirname(os.path.abspath(path)) != self.pasta:
+            return None
+        entry = self._entries.get(_entry_key(os.path.basename(path), flip))
+        if entry is None:
+            return None
+        width, height = entry["size"]
+        inicio = self._data + entry["offset"]
+        return Image.frombuffer('RGBA', (width, height), self._view[inicio:inicio + width * height * 4],
+                                'raw', 'RGBA', 0, 1)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+#   ABRE O ATLAS DE UMA PASTA (GERANDO-O DE NOVO SE NECESSÁRIO)
+def open_atlas(pasta, rebuild=True):
+    """
+    Abre o atlas de `pasta`. Se ele não existir, for de outra versão ou alguma figura
+    tiver sido criada, removida ou alterada (data ou tamanho), o atlas é gerado de novo.
+    Com rebuild=False, retorna None nesses casos (as figuras são lidas dos PNGs).
+    """
+    path = atlas_path_for(pasta)
+    if os.path.exists(path):
+        try:
+            atlas = ShapeAtlas(path)
+            if atlas.is_current():
+                return atlas
+        except (OSError, ValueError):
+            pass
+    if not rebuild:
+        return None
+    build_atlas(pasta, path)
+    return ShapeAtlas(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m PALAtlas",
+                                     description="Atlas de figuras pré-decodificadas (RGBA mapeado em memória).")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    for comando, ajuda in (("build", "Gera (ou regera) o atlas da pasta de figuras."),
+                           ("check", "Indica se o atlas está atualizado em relação às figuras.")):
+        p = sub.add_parser(comando, help=ajuda)
+        p.add_argument("--pasta", default="figuras", help="Pasta das figuras (padrão: figuras).")
+    args = parser.parse_args(argv)
+
+    if args.comando == "build":
+        path = build_atlas(args.pasta)
+        atlas = ShapeAtlas(path)
+        print(f"Atlas gerado em '{path}' ({len(atlas)} imagens, "
+              f"{os.path.getsize(path) / (1024 * 1024):.1f} MiB)")
+    else:
+        atlas = open_atlas(args.pasta, rebuild=False)
+        if atlas is None:
+            print(f"O atlas de '{args.pasta}' não existe ou está desatualizado.")
+            raise SystemExit(1)
+        print(f"O atlas de '{args.pasta}' está atualizado ({len(atlas)} imagens).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+
+"""
+Suíte de benchmark: gera Fittings sintéticos e mede cada etapa da renderização
+(leitura do JSON, agrupamento, carga dos recursos, alpha_composite, etiquetas e PNG).
+"""
+
+#   DIRETÓRIO DO PROJETO (as figuras são resolvidas a partir dele)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ("json_parse", "grouping", "asset_load", "alpha_composite", "labels", "png_encode")
+
+
+#   TIPOS DE ACESSÓRIO DISPONÍVEIS (no mapa de posições e com figura)
+def available_types(pasta, x_positions_map):
+    return sorted(tipo for tipo in x_positions_map
+                  if os.path.exists(os.path.join(pasta, f"{tipo}.png")))
+
+
+#   GERADOR DE FITTINGS SINTÉTICOS
+def generate_fittings(n_sections, fittings_per_section, enda_ratio=0.5, types=None, seed=0,
+                      first_section_id=100000):
+    """
+    Gera o bloco "Fittings" no formato colunar do input.json.
+
+    Args:
+        n_sections (int): número de seções (IdPipeSection).
+        fittings_per_section (int): acessórios por seção.
+        enda_ratio (float): fração dos acessórios na ponta EndA (espelhados).
+        types (list): tipos de acessório sorteados (padrão: os do mapa que têm figura).
+    """
+    if types is None:
+        from PALTesteNumerosMain import X_POSITIONS_MAP, PASTA_FIGURAS
+        types = available_types(os.path.join(PROJECT_DIR, PASTA_FIGURAS), X_POSITIONS_MAP)
+    rnd = random.Random(seed)
+    colunas = {"AccessoryType": [], "IdPipeSection": [], "Location": []}
+    for i in range(n_sections):
+        for _ in range(fittings_per_section):
+            colunas["AccessoryType"].append(rnd.choice(types))
+            colunas["IdPipeSection"].append(first_section_id + i)
+            colunas["Location"].append("EndA" if rnd.random() < enda_ratio else "EndB")
+    return colunas
+
+
+#   EXECUTA UM CENÁRIO
+def run_scenario(n_sections, fittings_per_section, enda_ratio, seed=0, scale=1.0):
+    from PALAssets import AssetCache, scaled_length
+    from PALInput import group_fittings
+    from PALOutput import encode_image
+    from PALResolve import AccessoryTable
+    from PALTesteNumerosMain import (
+        prepare_composer, X_POSITIONS_MAP, PASTA_FIGURAS, BACKGROUND_PATH, FONT_PATH, FONT_SIZE,
+    )
+    from PALRules import get_default_rules
+    from PALProfile import StageProfiler
+
+    pasta = os.path.join(PROJECT_DIR, PASTA_FIGURAS)
+    background_path = os.path.join(PROJECT_DIR, BACKGROUND_PATH)
+    tempos = dict.fromkeys(STAGES, 0.0)
+
+    texto = json.dumps({"Fittings": generate_fittings(n_sections, fittings_per_section,
+                                                      enda_ratio, seed=seed)})
+    inicio = time.perf_counter()
+    dados = json.loads(texto)
+    tempos["json_parse"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    sections = group_fittings(dados["Fittings"])
+    tempos["grouping"] = time.perf_counter() - inicio
+
+    # Cache novo: mede a decodificação das figuras usadas a partir do disco.
+    assets = AssetCache()
+    rules = get_default_rules()
+    inicio = time.perf_counter()
+    table = AccessoryTable(pasta, X_POSITIONS_MAP)
+    assets.get_font(FONT_PATH, scaled_length(FONT_SIZE, scale, minimum=1))
+    assets.get_background(background_path, scale=scale)
+    for tipo in {linha["AccessoryType"] for _, fittings in sections for linha in fittings}:
+        for flip in (False, True):
+            assets.get_shape(os.path.join(pasta, f"{tipo}.png"), flip, scale)
+    tempos["asset_load"] = time.perf_counter() - inicio
+
+    # As etapas de composição e etiquetas são medidas pelos ganchos do ImageComposer.
+    profiler = StageProfiler()
+    componentes = 0
+    bytes_png = 0
+    inicio_total = time.perf_counter()
+    for section_id, fittings in sections:
+        # O mesmo caminho da renderização real (resolução dos tipos, regras e espelhamento).
+        composer = prepare_composer(section_id, fittings, pasta=pasta, background_path=background_path,
+                                    font_path=FONT_PATH, font_size=FONT_SIZE,
+                                    x_positions_map=X_POSITIONS_MAP, assets=assets, rules=rules,
+                                    avisar=lambda mensagem: None, profiler=profiler, table=table,
+                                    scale=scale)
+        componentes += len(composer.components_to_draw)
+        image = composer.assemble_duct()
+
+        buffer = io.BytesIO()
+        inicio = time.perf_counter()
+        encode_image(image, buffer)
+        tempos["png_encode"] += time.perf_counter() - inicio
+        bytes_png += buffer.tell()
+    total_render = time.perf_counter() - inicio_total
+    etapas = profiler.summary()["stages"]
+    for stage in ("alpha_composite", "labels"):
+        tempos[stage] = etapas.get(stage, {}).get("total_s", 0.0)
+
+    return {
+        "sections": n_sections,
+        "fittings_per_section": fittings_per_section,
+        "enda_ratio": enda_ratio,
+        "scale": scale,
+        "components": componentes,
+        "stages_s": tempos,
+        "render_loop_s": total_render,
+        "ms_per_section": 1000 * total_render / max(n_sections, 1),
+        "png_bytes_per_section": bytes_png / max(n_sections, 1),
+    }
+
+
+#   METADADOS DA EXECUÇÃO
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import PIL
+        pillow = PIL.__version__
+    except ImportError:
+        pillow = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pillow": pillow,
+        "platform": platform.platform(),
+    }
+
+
+def run_suite(sections=(10, 100), fittings=(4, 8), enda_ratios=(0.5,), seed=0, scales=(1.0,)):
+    """ Executa todos os cenários e devolve o resultado como dicionário serializável. """
+    cenarios = []
+    for n in sections:
+        for k in fittings:
+            for ratio in enda_ratios:
+                for scale in scales:
+                    cenarios.append(run_scenario(n, k, ratio, seed=seed, scale=scale))
+    return {"metadata": _metadata(), "scenarios": cenarios}
+
+
+#   COMPARA COM UM RESULTADO ANTERIOR
+def compare(anterior, atual):
+    """ Devolve linhas de texto com a razão atual/anterior de cada etapa, por cenário. """
+    chave = lambda c: (c["sections"], c["fittings_per_section"], c["enda_ratio"], c.get("scale", 1.0))
+    antigos = {chave(c): c for c in anterior["scenarios"]}
+    linhas = []
+    for cenario in atual["scenarios"]:
+        antigo = antigos.get(chave(cenario))
+        if antigo is None:
+            continue
+        razoes = []
+        for etapa in STAGES:
+            base = antigo["stages_s"].get(etapa) or 0.0
+            razoes.append(f"{etapa}={cenario['stages_s'][etapa] / base:.2f}x" if base else f"{etapa}=-")
+        linhas.append(f"{chave(cenario)}: " + " ".join(razoes))
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapa da renderização dos dutos.")
+    parser.add_argument("--sections", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--fittings", type=int, nargs="+", default=[4, 8],
+                        help="Acessórios por seção.")
+    parser.add_argument("--enda-ratio", type=float, nargs="+", default=[0.5],
+                        help="Fração dos acessórios na ponta EndA.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, nargs="+", default=[1.0],
+                        help="Escalas do desenho a medir (ex.: 1 0.25 0.125).")
+    parser.add_argument("--output", default=None,
+                        help="Arquivo JSON de resultado (padrão: imprime no console).")
+    parser.add_argument("--compare", default=None, metavar="ANTERIOR.json",
+                        help="Compara cada etapa com um resultado salvo anteriormente.")
+    args = parser.parse_args(argv)
+
+    # O aviso de fonte não deve poluir a saída JSON.
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        resultado = run_suite(args.sections, args.fittings, args.enda_ratio, args.seed, args.scale)
+    finally:
+        sys.stdout = stdout
+
+    texto = json.dumps(resultado, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        print(f"Resultado salvo em '{args.output}'")
+    else:
+        print(texto)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(f"Comparação com '{args.compare}' (atual / anterior):")
+        for linha in compare(anterior, resultado):
+            print(linha)
+
+
+if __name__ == "__main__":
+    main()
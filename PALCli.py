@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+
+from PALConfig import PASTA_FIGURAS, JSON_PATH, X_POSITIONS_MAP
+from PALResolve import AccessoryTable
+
+"""
+Linha de comando do projeto, com subcomandos:
+
+    python -m PALCli render [--input input.json] [--section ID ...] [opções]
+    python -m PALCli line [--input input.json] [--output Pipe_Line.tif] [opções]
+    python -m PALCli validate [--input input.json]
+    python -m PALCli list-sections [--input input.json]
+    python -m PALCli bench [opções do PALBench]
+
+Os módulos pesados (PIL, pandas, NumPy, multiprocessing) só são importados pelo
+subcomando que precisa deles: validate e list-sections usam apenas a biblioteca padrão.
+"""
+
+REQUIRED_KEYS = ("AccessoryType", "IdPipeSection", "Location")
+# Tipos aceitos em cada campo: IdPipeSection é texto ou inteiro; os demais, texto
+# (listas ou objetos quebrariam o agrupamento e as regras).
+FIELD_TYPES = {"AccessoryType": str, "IdPipeSection": (str, int), "Location": str}
+LOCATIONS = ("EndA", "EndB")
+
+
+#   ARGUMENTOS DO SUBCOMANDO render
+def _add_render_arguments(parser):
+    parser.add_argument("--input", default=JSON_PATH, help="Arquivo JSON de entrada (padrão: input.json).")
+    parser.add_argument("--section", action="append", default=None, metavar="ID",
+                        help="Renderiza apenas esta seção (pode ser repetido).")
+    parser.add_argument("--output-dir", default="",
+                        help="Diretório das imagens geradas (padrão: o diretório atual).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de processos para renderizar as seções em paralelo (padrão: 1).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Lê os Fittings de forma incremental (JSON ou JSON Lines) e renderiza "
+                             "cada seção assim que ela termina, na ordem do arquivo.")
+    parser.add_argument("--sorted", action="store_true",
+                        help="Com --stream, mantém a ordem crescente de IdPipeSection "
+                             "(acumula todas as seções em memória).")
+    parser.add_argument("--rules", default=None,
+                        help="Arquivo de regras de posicionamento (JSON ou YAML; padrão: regras_layout.json).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Renderiza apenas as seções alteradas desde a última execução "
+                             "(usa o manifesto .pal_manifest.json junto às imagens).")
+    parser.add_argument("--format", default="png", choices=["png", "webp", "jpeg"],
+                        help="Formato das imagens geradas (padrão: png).")
+    parser.add_argument("--compress-level", type=int, default=6,
+                        help="Nível de compressão do PNG, de 0 (mais rápido) a 9 (padrão: 6).")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Otimiza a compressão do PNG (arquivos menores, codificação mais lenta).")
+    parser.add_argument("--quantize", type=int, default=None, metavar="CORES",
+                        help="Converte a imagem para uma paleta com esse número de cores.")
+    parser.add_argument("--drop-alpha", nargs="?", const=True, default=False, choices=["auto"],
+                        help="Remove o canal alfa (com 'auto', apenas se a imagem for opaca).")
+    parser.add_argument("--quality", type=int, default=90,
+                        help="Qualidade de WebP/JPEG (WebP com 100 é sem perdas).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mede cada etapa e imprime um resumo (p50/p95 por etapa e por tipo) no final.")
+    parser.add_argument("--pandas", action="store_true",
+                        help="Agrupa as seções com pandas (groupby) em vez de dicionários.")
+    parser.add_argument("--atlas", action="store_true",
+                        help="Lê as figuras do atlas pré-decodificado (figuras/.pal_atlas.bin), "
+                             "gerado de novo automaticamente quando alguma figura muda.")
+    parser.add_argument("--backend", default="pillow", choices=["pillow", "numpy"],
+                        help="Composição dos shapes: uma seção por vez (pillow, padrão) ou em "
+                             "lotes vetorizados (numpy, requer NumPy).")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Seções por lote com --backend numpy (padrão: 16).")
+    _add_scale_argument(parser)
+
+
+def _add_scale_argument(parser):
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Escala do desenho, ex.: 0.25 ou 0.125 para prévias e miniaturas "
+                             "(padrão: 1, resolução original).")
+
+
+#   ARGUMENTOS DO SUBCOMANDO line
+def _add_line_arguments(parser):
+    parser.add_argument("--input", default=JSON_PATH, help="Arquivo JSON de entrada (padrão: input.json).")
+    parser.add_argument("--section", action="append", default=None, metavar="ID",
+                        help="Inclui apenas esta seção (pode ser repetido).")
+    parser.add_argument("--output", default="Pipe_Line.tif",
+                        help="Arquivo gerado: .tif/.tiff (em blocos) ou .png (padrão: Pipe_Line.tif).")
+    parser.add_argument("--direction", default="horizontal", choices=["horizontal", "vertical"],
+                        help="Seções de ponta a ponta (horizontal, padrão) ou empilhadas (vertical). "
+                             "O PNG só aceita vertical.")
+    parser.add_argument("--numbering", default="section", choices=["section", "continuous"],
+                        help="Numeração dos acessórios: reinicia em cada seção (section, padrão, "
+                             "como nas imagens individuais) ou segue pela linha inteira (continuous).")
+    parser.add_argument("--tile-size", type=int, default=256,
+                        help="Lado dos blocos do TIFF, múltiplo de 16 (padrão: 256).")
+    parser.add_argument("--compress-level", type=int, default=6,
+                        help="Nível de compressão zlib, de 0 a 9 (padrão: 6).")
+    parser.add_argument("--drop-alpha", action="store_true", help="Grava RGB, sem o canal alfa.")
+    _add_scale_argument(parser)
+    parser.add_argument("--stream", action="store_true",
+                        help="Lê os Fittings de forma incremental (JSON ou JSON Lines), na ordem do arquivo.")
+    parser.add_argument("--sorted", action="store_true",
+                        help="Com --stream, mantém a ordem crescente de IdPipeSection.")
+    parser.add_argument("--rules", default=None,
+                        help="Arquivo de regras de posicionamento (JSON ou YAML; padrão: regras_layout.json).")
+
+
+#   SUBCOMANDO render
+def cmd_render(args):
+    try:
+        sections = _read_sections(args)
+
+        from PALRender import render_all
+        from PALRules import load_rules
+        from PALOutput import OutputOptions
+        rules = load_rules(args.rules) if args.rules else None
+        output = OutputOptions(format=args.format, compress_level=args.compress_level,
+                               optimize=args.optimize, quantize=args.quantize,
+                               drop_alpha=args.drop_alpha, quality=args.quality)
+        profiler = None
+        if args.profile:
+            from PALProfile import StageProfiler
+            profiler = StageProfiler()
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        resultados = render_all(sections, workers=args.workers, output_dir=args.output_dir, rules=rules,
+                                incremental=args.incremental, output=output, profiler=profiler,
+                                atlas=args.atlas, backend=args.backend, batch_size=args.batch_size,
+                                scale=args.scale)
+        if profiler is not None:
+            print(profiler.report())
+
+    except FileNotFoundError as e:
+        print(f"Erro: {e}")
+        return 2
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado: {e}")
+        return 2
+    # Código de saída 1 se alguma seção falhou (os erros já foram impressos por render_all).
+    return 1 if any(erro is not None for _, _, erro in resultados) else 0
+
+
+#   SECÕES DA ENTRADA (render e line)
+def _read_sections(args, check=False):
+    """
+    Com check=True, cada registro é conferido (record_problem) antes do agrupamento e o
+    primeiro registro malformado interrompe a leitura com ValueError.
+    """
+    if args.stream:
+        from PALInput import iter_fittings, iter_sections
+        records = iter_fittings(args.input)
+        sections = iter_sections(_checked(records) if check else records, sort=args.sorted)
+    else:
+        from PALInput import group_fittings, rows_from_columns
+        with open(args.input, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        if not isinstance(dados, dict) or "Fittings" not in dados:
+            raise ValueError(f"'{args.input}' não tem a chave \"Fittings\".")
+        fittings = dados["Fittings"]
+        if check:
+            if isinstance(fittings, dict):
+                fittings = rows_from_columns(fittings)
+            fittings = list(_checked(fittings))
+        # Agrupa todas as seções de uma vez (sem um filtro booleano por seção).
+        sections = group_fittings(fittings, use_pandas=getattr(args, "pandas", False))
+    if args.section:
+        escolhidas = set(args.section)
+        sections = (item for item in sections if str(item[0]) in escolhidas)
+    return sections
+
+
+def _checked(records):
+    for n, record in enumerate(records, start=1):
+        problema = record_problem(record)
+        if problema is not None:
+            raise ValueError(f"Registro {n}: {problema}")
+        yield record
+
+
+#   SUBCOMANDO line
+def cmd_line(args):
+    try:
+        # Um registro malformado interromperia o desenho no meio da linha: confere antes.
+        sections = _read_sections(args, check=True)
+        from PALLine import render_line
+        from PALRules import load_rules
+        rules = load_rules(args.rules) if args.rules else None
+        n_secoes, largura, altura = render_line(
+            sections, args.output, direction=args.direction, numbering=args.numbering,
+            tile_size=args.tile_size, compress_level=args.compress_level,
+            drop_alpha=args.drop_alpha, rules=rules, scale=args.scale)
+    except KeyError as e:
+        print(f"Erro: campo ausente em um acessório da entrada: {e}")
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}")
+        return 2
+    print(f"Desenho da linha ({n_secoes} seção(ões), {largura}x{altura}) salvo como '{args.output}'")
+    return 0
+
+
+#   CONFERE A ESTRUTURA DE UM REGISTRO
+def record_problem(record):
+    """
+    Returns:
+        str: o problema do registro (objeto, campos ausentes ou com valor de tipo
+             inválido), ou None se ele pode ser agrupado e renderizado.
+    """
+    if not isinstance(record, dict):
+        return "não é um objeto JSON."
+    faltando = [chave for chave in REQUIRED_KEYS if record.get(chave) is None]
+    if faltando:
+        return f"campo(s) ausente(s): {', '.join(faltando)}."
+    invalidos = [chave for chave in REQUIRED_KEYS if isinstance(record[chave], bool)
+                 or not isinstance(record[chave], FIELD_TYPES[chave])]
+    if invalidos:
+        return "valor de tipo inválido em: " + ", ".join(
+            f"{chave}={json.dumps(record[chave], ensure_ascii=False)}" for chave in invalidos) + "."
+    return None
+
+
+#   SUBCOMANDO validate
+def validate_fittings(records, pasta=PASTA_FIGURAS, x_positions_map=X_POSITIONS_MAP):
+    """
+    Confere os registros sem renderizar nada.
+
+    Returns:
+        tuple: (lista de problemas encontrados, número de registros, número de seções).
+    """
+    problemas = []
+    secoes = set()
+    tipos = Counter()
+    total = 0
+    for n, record in enumerate(records, start=1):
+        total = n
+        problema = record_problem(record)
+        if problema is not None:
+            problemas.append(f"Registro {n}: {problema}")
+            continue
+        if record["Location"] not in LOCATIONS:
+            problemas.append(f"Registro {n} (ID {record['IdPipeSection']}): Location "
+                             f"'{record['Location']}' inválida (use {' ou '.join(LOCATIONS)}).")
+        secoes.add(record["IdPipeSection"])
+        tipos[record["AccessoryType"]] += 1
+
+    # Uma única listagem da pasta para todos os tipos (sem um stat por tipo).
+    table = AccessoryTable(pasta, x_positions_map).resolve_all(tipos)
+    for tipo, quantidade in sorted(tipos.items()):
+        if tipo in table.unmapped:
+            problemas.append(f"Tipo '{tipo}' ({quantidade} acessório(s)) não está no mapa de posições X.")
+        if tipo in table.missing_images:
+            problemas.append(f"Tipo '{tipo}' ({quantidade} acessório(s)) não tem imagem em '{pasta}'.")
+    return problemas, total, len(secoes)
+
+
+def cmd_validate(args):
+    from PALInput import iter_fittings
+    try:
+        problemas, total, secoes = validate_fittings(iter_fittings(args.input), pasta=args.pasta)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Erro ao ler '{args.input}': {e}")
+        return 2
+    # Entradas do mapa sem figura (ex.: erro de digitação no nome) não invalidam a entrada.
+    for tipo in AccessoryTable(args.pasta, X_POSITIONS_MAP).map_keys_without_image():
+        print(f"Aviso: o mapa de posições X tem '{tipo}', que não tem imagem em '{args.pasta}'.")
+    for problema in problemas:
+        print(problema)
+    if problemas:
+        print(f"{len(problemas)} problema(s) em {total} acessório(s) de {secoes} seção(ões).")
+        return 1
+    print(f"Entrada válida: {total} acessório(s) em {secoes} seção(ões).")
+    return 0
+
+
+#   SUBCOMANDO list-sections
+def cmd_list_sections(args):
+    from PALInput import iter_fittings
+    try:
+        contagem = Counter(record["IdPipeSection"] for record in iter_fittings(args.input))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Erro ao ler '{args.input}': {e}")
+        return 2
+    for section_id in sorted(contagem):
+        print(f"{section_id}\t{contagem[section_id]} acessório(s)")
+    return 0
+
+
+#   SUBCOMANDO bench
+def cmd_bench(args, extras):
+    from PALBench import main as bench_main
+    bench_main(extras)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m PALCli",
+                                     description="Geração das imagens dos dutos de cada IdPipeSection.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    _add_render_arguments(sub.add_parser("render", help="Gera as imagens das seções."))
+    _add_line_arguments(sub.add_parser("line", help="Gera um único desenho com todas as seções em sequência."))
+    for nome, ajuda in (("validate", "Confere a entrada (campos, tipos e imagens) sem renderizar."),
+                        ("list-sections", "Lista as seções da entrada e o número de acessórios.")):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument("--input", default=JSON_PATH, help="Arquivo JSON de entrada (padrão: input.json).")
+        if nome == "validate":
+            p.add_argument("--pasta", default=PASTA_FIGURAS, help="Pasta das figuras (padrão: figuras).")
+    sub.add_parser("bench", add_help=False,
+                   help="Benchmark por etapa (repassa as opções ao PALBench; veja bench --help).")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extras = parser.parse_known_args(argv)
+    if args.comando == "bench":
+        return cmd_bench(args, extras)
+    if extras:
+        parser.error(f"argumentos não reconhecidos: {' '.join(extras)}")
+    comandos = {"render": cmd_render, "line": cmd_line, "validate": cmd_validate, "list-sections": cmd_list_sections}
+    return comandos[args.comando](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import os
+
+"""
+Configuração padrão do projeto (pastas, fonte e posições X de cada tipo de acessório).
+Não importa PIL nem pandas: pode ser lida por comandos rápidos como a validação da entrada.
+"""
+
+#   CONFIGURAÇÃO PADRÃO
+PASTA_FIGURAS = "figuras"
+BACKGROUND_PATH = os.path.join(PASTA_FIGURAS, "Pipe.png")
+FONT_PATH = "arial.ttf"
+FONT_SIZE = 60
+JSON_PATH = "input.json"
+
+X_POSITIONS_MAP = {  # Valores de x_position para cada tipo de acessório
+    #       Tipo de linha: Flexivel            #
+    #------------------------------------------#
+    "Pulling Head": 330,    # Cabeça de Tração
+    "Streamlined Pulling Head": 330, # Cabeça de Tração Perfilada
+    "End Fitting": 430,    # Conector
+    "Flange Adapter": 330,    # Adaptador de Flanges
+    "Polymeric Clamp Protection": 380, # Protetor de Flanges
+    "Restrictor": 662,    # Vértebra
+    "Uraduct": 662, # Uraduct / Capa de linha
+    "Intermediate Stiffener": 662,   # Enrijecedor intermediário
+    "Top Stiffener(w helmet)": 640,   # Enrijecedor de topo com capacete
+    "Top Stiffener(wo helmet)": 662,    # Enrijecedor de topo sem capacete
+    "Pull-In Collar": 580,  # Kit de pull-in
+    "Stopper Collar": 1015,  # Colar batente
+    "Dead Weight Collar": 550, # Colar de peso morto
+    "Buoys for Lazy Wave": 1127,  # Flutuador de lazy wave
+    "Set of Anode Collar(end fitting)": 530,   # Colar de Anodo (conector)
+    "Set of Anode Collar(line)": 710,  # Colar de Anodo (linha) / se tiver componente maiores (930)
+    "Set of Anode Collar": 710,
+    "Anchorage Collar": 580,  # Colar de Ancoragem
+    "Anchorage Collar(inverted)": 580,  # Colar de Ancoragem Invertido
+    #       Tipo de linha: Umbilical           #
+    #------------------------------------------#
+    "Slim Pulling Head": 000,   # Cabeça de Tração Fina
+    "Anchorage Collar2": 580,  # Colar de Ancoragem Umbilical
+    "Anchorage Collar2(inverted)": 580,  # Colar de Ancoragem Umbilical
+    "Buldous Pulling Connector": 000,   # Conector de Tração Bojuda
+    "Armour Pot(w eyelet)": 430,    # Armour por com olhal
+    "Armour Pot(wo eyelet)": 430,    # Armour pot sem olhal
+    "Junction Box": 000,         #Caixa de Emenda
+}
@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+
+"""
+Renderização incremental: impressão digital de cada seção e manifesto das saídas já geradas.
+"""
+
+#   NOME DO MANIFESTO (GRAVADO JUNTO ÀS SAÍDAS)
+MANIFEST_NAME = ".pal_manifest.json"
+
+# Incrementar quando a forma de desenhar mudar, para invalidar os manifestos antigos.
+RENDER_VERSION = 1
+
+
+#   NORMALIZA UM VALOR (pandas usa NaN e tipos do NumPy; o modo com dicionários não)
+def _normalize(value):
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class SectionFingerprinter:
+    """
+    Calcula a impressão digital de uma seção a partir dos acessórios, das posições
+    X usadas, das regras, da fonte e da data/tamanho dos arquivos de figuras
+    referenciados. Cada arquivo é consultado (stat) no máximo uma vez por execução.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, pasta, background_path, font_path, font_size, x_positions_map, rules,
+                 extra=None):
+        self.pasta = pasta
+        self.x_positions_map = x_positions_map
+        self._stats = {}
+        comum = {
+            "version": RENDER_VERSION,
+            "background": self._file_signature(background_path),
+            "font": [font_path, font_size, self._file_signature(font_path) if font_path else None],
+            "rules": rules.to_dict(),
+            "extra": extra,
+        }
+        self._comum = json.dumps(comum, sort_keys=True, default=str).encode('utf-8')
+
+    #  ASSINATURA DE UM ARQUIVO (mtime e tamanho)
+    def _file_signature(self, path):
+        signature = self._stats.get(path)
+        if signature is None:
+            try:
+                st = os.stat(path)
+                signature = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                signature = []
+            self._stats[path] = signature
+        return signature
+
+    #  IMPRESSÃO DIGITAL DE UMA SEÇÃO
+    def fingerprint(self, fittings_in_section):
+        tipos = sorted({linha["AccessoryType"] for linha in fittings_in_section})
+        dados = {
+            "fittings": [{k: _normalize(v) for k, v in linha.items()} for linha in fittings_in_section],
+            "x": [self.x_positions_map.get(tipo) for tipo in tipos],
+            "assets": [self._file_signature(os.path.join(self.pasta, f"{tipo}.png")) for tipo in tipos],
+        }
+        h = hashlib.sha256(self._comum)
+        h.update(json.dumps(dados, sort_keys=True, default=str).encode('utf-8'))
+        return h.hexdigest()
+
+
+class Manifest:
+    """
+    Manifesto {section_id: impressão digital} das imagens já geradas em um diretório.
+    """
+
+    def __init__(self, output_dir=""):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("sections", {})
+            except (ValueError, OSError):
+                # Manifesto corrompido: tudo será renderizado novamente.
+                self.entries = {}
+
+    def is_current(self, section_id, fingerprint, output_filename):
+        return self.entries.get(str(section_id)) == fingerprint and os.path.exists(output_filename)
+
+    def update(self, section_id, fingerprint):
+        self.entries[str(section_id)] = fingerprint
+
+    def save(self):
+        temporario = self.path + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"version": RENDER_VERSION, "sections": self.entries}, f)
+        os.replace(temporario, self.path)
@@ -0,0 +1,214 @@
+import json
+
+"""
+Leitura incremental dos acessórios (Fittings) e agrupamento por IdPipeSection.
+"""
+
+#   TAMANHO DO BLOCO DE LEITURA
+CHUNK_SIZE = 64 * 1024
+
+# Caracteres que podem continuar um número JSON.
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _JsonStream:
+    """
+    Leitor mínimo de JSON por partes: decodifica um valor de cada vez com
+    `raw_decode`, lendo do arquivo apenas o necessário.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    #  LÊ MAIS DADOS DO ARQUIVO
+    def _fill(self):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        # Lê no mínimo o tamanho atual do buffer, para que valores grandes não
+        # sejam redecodificados um número quadrático de vezes.
+        data = self.f.read(max(self.chunk_size, len(self.buf)))
+        if not data:
+            self.eof = True
+        self.buf += data
+
+    #  PULA ESPAÇOS EM BRANCO
+    def skip_ws(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return
+            self._fill()
+
+    def peek(self):
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: esperado '{char}' na posição {self.pos}.")
+        self.pos += 1
+
+    #  DECODIFICA O PRÓXIMO VALOR
+    def decode_value(self):
+        self.skip_ws()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # Um número no fim do buffer (ou seguido de uma fração ou de um expoente
+                # ainda incompletos, como "1." ou "1e") pode continuar no próximo bloco.
+                numero = isinstance(value, (int, float)) and not isinstance(value, bool)
+                if self.eof or (end < len(self.buf) and not (numero and self.buf[end] in _NUMBER_CHARS)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    #  ITERA OS ELEMENTOS DE UM ARRAY
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou ']' na posição {self.pos - 1}.")
+
+
+#   REGISTROS A PARTIR DO FORMATO COLUNAR
+def rows_from_columns(columns):
+    """
+    Converte o formato colunar ({"coluna": [valores]} ou {"coluna": {índice: valor}},
+    o mesmo aceito por pd.DataFrame) em uma sequência de registros.
+    """
+    names = list(columns)
+    values = []
+    for name in names:
+        column = columns[name]
+        values.append(list(column.values()) if isinstance(column, dict) else column)
+    for row in zip(*values):
+        yield dict(zip(names, row))
+
+
+#   LEITURA INCREMENTAL DOS ACESSÓRIOS
+def iter_fittings(json_path, key="Fittings"):
+    """
+    Gera os registros de acessórios do arquivo, um por vez.
+
+    Formatos aceitos:
+        - JSON Lines (.jsonl / .ndjson): um registro por linha;
+        - JSON com um array de registros no topo;
+        - JSON com um objeto cuja chave `key` contém um array de registros
+          (lido elemento a elemento) ou o formato colunar do input.json
+          (neste caso a coluna inteira precisa ser carregada).
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        if json_path.endswith((".jsonl", ".ndjson")):
+            for linha in f:
+                linha = linha.strip()
+                if linha:
+                    yield json.loads(linha)
+            return
+
+        stream = _JsonStream(f)
+        if stream.peek() == "[":
+            yield from stream.iter_array()
+            return
+
+        stream.expect("{")
+        while stream.peek() != "}":
+            name = stream.decode_value()
+            stream.expect(":")
+            if name == key:
+                if stream.peek() == "[":
+                    yield from stream.iter_array()
+                else:
+                    yield from rows_from_columns(stream.decode_value())
+                return
+            stream.decode_value()
+            if stream.peek() == ",":
+                stream.pos += 1
+        raise KeyError(key)
+
+
+#   AGRUPAMENTO POR SEÇÃO
+def iter_sections(records, sort=False, key="IdPipeSection"):
+    """
+    Agrupa os registros por IdPipeSection e gera pares (section_id, fittings).
+
+    Com sort=False as seções são entregues assim que terminam (registros da mesma
+    seção devem estar contíguos); a memória usada depende apenas da maior seção.
+    Com sort=True todas as seções são acumuladas e entregues em ordem crescente,
+    como no modo tradicional.
+    """
+    if sort:
+        grupos = {}
+        for record in records:
+            grupos.setdefault(record[key], []).append(record)
+        for section_id in sorted(grupos):
+            yield section_id, grupos[section_id]
+        return
+
+    concluidas = set()
+    atual = None
+    fittings = []
+    for record in records:
+        section_id = record[key]
+        if section_id != atual:
+            if fittings:
+                concluidas.add(atual)
+                yield atual, fittings
+            if section_id in concluidas:
+                raise ValueError(
+                    f"Os registros da seção {section_id} não estão contíguos; "
+                    f"use a ordenação (sort=True) para este arquivo."
+                )
+            atual = section_id
+            fittings = []
+        fittings.append(record)
+    if fittings:
+        yield atual, fittings
+
+
+#   AGRUPAMENTO EM UMA ÚNICA PASSADA (DOCUMENTO COMPLETO)
+def group_fittings(fittings, use_pandas=False, key="IdPipeSection"):
+    """
+    Agrupa os acessórios já carregados (formato colunar ou lista de registros)
+    em uma única passada e retorna a lista [(section_id, fittings), ...] em
+    ordem crescente de IdPipeSection.
+
+    Por padrão usa apenas dicionários; com use_pandas=True monta um DataFrame
+    e usa groupby (pandas só é importado neste caso).
+    """
+    if use_pandas:
+        return _group_fittings_pandas(fittings, key)
+    if isinstance(fittings, dict):
+        fittings = rows_from_columns(fittings)
+    return list(iter_sections(fittings, sort=True, key=key))
+
+
+def _group_fittings_pandas(fittings, key):
+    import pandas as pd
+
+    df = pd.DataFrame(fittings)
+    # Converte as linhas uma única vez e distribui pelos índices de cada grupo.
+    records = df.to_dict("records")
+    indices = df.groupby(key, sort=True).indices
+    return [
+        (section_id, [records[i] for i in indices[section_id]])
+        for section_id in sorted(indices)
+    ]
@@ -0,0 +1,342 @@
+import os
+import zlib
+import itertools
+import struct
+from array import array
+
+from PIL import Image
+
+from PALResolve import AccessoryTable
+from PALTesteNumerosMain import (
+    prepare_composer, PASTA_FIGURAS, BACKGROUND_PATH, FONT_PATH, FONT_SIZE, X_POSITIONS_MAP,
+)
+
+"""
+Desenho contínuo da linha: todas as seções (IdPipeSection) lado a lado em uma única
+imagem, gravada aos poucos. Cada seção é montada pelo ImageComposer, cortada em blocos
+e descartada, de modo que a memória usada não depende do comprimento da linha:
+
+    - TIFF (.tif/.tiff): BigTIFF em blocos (tiles) comprimidos com deflate; aceita a
+      linha na horizontal (seções de ponta a ponta) ou na vertical.
+    - PNG (.png): gravado linha de pixels a linha de pixels; como cada linha de pixels
+      de um PNG atravessa a imagem inteira, só aceita as seções empilhadas na vertical.
+"""
+
+#   TAMANHO PADRÃO DOS BLOCOS DO TIFF (múltiplo de 16, exigido pelo formato)
+DEFAULT_TILE_SIZE = 256
+
+DIRECTIONS = ("horizontal", "vertical")
+NUMBERINGS = ("section", "continuous")
+
+# Tamanho mínimo de cada chunk IDAT do PNG.
+_IDAT_SIZE = 256 * 1024
+
+# Tipos de campo do TIFF.
+_SHORT, _LONG, _LONG8 = 3, 4, 16
+
+
+#   GRAVADOR DE PNG POR LINHAS DE PIXELS
+class PngStreamWriter:
+    """
+    Grava um PNG de largura fixa recebendo faixas de linhas de pixels (imagens com a
+    mesma largura). A altura total só é conhecida no fechamento: o cabeçalho (IHDR) é
+    reescrito no final, por isso o arquivo precisa permitir seek.
+
+    Args:
+        path (str): arquivo de saída.
+        width (int): largura da imagem.
+        mode (str): 'RGBA' ou 'RGB'.
+        compress_level (int): nível de compressão zlib, de 0 a 9.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, path, width, mode="RGBA", compress_level=6):
+        if mode not in ("RGBA", "RGB"):
+            raise ValueError(f"Modo de imagem não suportado: '{mode}'.")
+        self.width = width
+        self.mode = mode
+        self.height = 0
+        self._f = open(path, "wb")
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_size = 0
+        self._f.write(b"\x89PNG\r\n\x1a\n")
+        self._ihdr_offset = self._f.tell()
+        self._write_chunk(b"IHDR", self._ihdr())
+
+    def _ihdr(self):
+        color_type = 6 if self.mode == "RGBA" else 2
+        return struct.pack(">IIBBBBB", self.width, self.height, 8, color_type, 0, 0, 0)
+
+    def _write_chunk(self, tipo, dados):
+        self._f.write(struct.pack(">I", len(dados)) + tipo + dados)
+        self._f.write(struct.pack(">I", zlib.crc32(tipo + dados)))
+
+    def _flush_idat(self, final=False):
+        if self._pending and (final or self._pending_size >= _IDAT_SIZE):
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    #  ACRESCENTA UMA FAIXA DE LINHAS DE PIXELS
+    def write_rows(self, image):
+        if image.width != self.width:
+            raise ValueError(f"Largura {image.width} diferente da largura do PNG ({self.width}).")
+        if image.mode != self.mode:
+            image = image.convert(self.mode)
+        dados = image.tobytes()
+        passo = self.width * len(self.mode)
+        # Filtro 0 (nenhum) em todas as linhas: o byte do filtro precede cada linha.
+        for inicio in range(0, len(dados), passo):
+            comprimido = self._compressor.compress(b"\x00" + dados[inicio:inicio + passo])
+            if comprimido:
+                self._pending.append(comprimido)
+                self._pending_size += len(comprimido)
+        self.height += image.height
+        self._flush_idat()
+
+    #  FINALIZA O ARQUIVO
+    def close(self):
+        self._pending.append(self._compressor.flush())
+        self._flush_idat(final=True)
+        self._write_chunk(b"IEND", b"")
+        self._f.seek(self._ihdr_offset)
+        self._write_chunk(b"IHDR", self._ihdr())
+        self._f.close()
+
+
+#   GRAVADOR DE TIFF EM BLOCOS
+class TiledTiffWriter:
+    """
+    Grava um BigTIFF em blocos quadrados comprimidos com deflate, em qualquer ordem.
+    Os dados de cada bloco vão direto para o arquivo; só as posições dos blocos ficam
+    em memória até o fechamento, quando o diretório (IFD) é gravado no fim do arquivo.
+
+    Args:
+        path (str): arquivo de saída.
+        tile_size (int): lado dos blocos, múltiplo de 16.
+        mode (str): 'RGBA' ou 'RGB'.
+        compress_level (int): nível de compressão zlib, de 0 a 9.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, path, tile_size=DEFAULT_TILE_SIZE, mode="RGBA", compress_level=6):
+        if tile_size <= 0 or tile_size % 16:
+            raise ValueError(f"O tamanho do bloco do TIFF deve ser múltiplo de 16 (recebido: {tile_size}).")
+        if mode not in ("RGBA", "RGB"):
+            raise ValueError(f"Modo de imagem não suportado: '{mode}'.")
+        self.tile_size = tile_size
+        self.mode = mode
+        self.compress_level = compress_level
+        self._f = open(path, "wb")
+        # Cabeçalho BigTIFF; a posição do IFD é preenchida no fechamento.
+        self._f.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, 0))
+        self._cols = array("I")
+        self._rows = array("I")
+        self._offsets = array("Q")
+        self._counts = array("Q")
+
+    #  GRAVA UM BLOCO (coluna e linha na grade de blocos)
+    def write_tile(self, col, row, image):
+        if image.size != (self.tile_size, self.tile_size):
+            raise ValueError(f"Bloco com tamanho {image.size}; esperado {self.tile_size}x{self.tile_size}.")
+        if image.mode != self.mode:
+            image = image.convert(self.mode)
+        dados = zlib.compress(image.tobytes(), self.compress_level)
+        self._cols.append(col)
+        self._rows.append(row)
+        self._offsets.append(self._f.tell())
+        self._counts.append(len(dados))
+        self._f.write(dados)
+
+    #  FINALIZA O ARQUIVO
+    def close(self, width, height):
+        """ Grava o IFD de uma imagem width x height; blocos não gravados ficam vazios. """
+        t = self.tile_size
+        across, down = -(-width // t), -(-height // t)
+        offsets = array("Q", bytes(8 * across * down))
+        counts = array("Q", bytes(8 * across * down))
+        for col, row, offset, count in zip(self._cols, self._rows, self._offsets, self._counts):
+            offsets[row * across + col] = offset
+            counts[row * across + col] = count
+
+        spp = len(self.mode)
+        campos = [
+            (256, _LONG, [width]),
+            (257, _LONG, [height]),
+            (258, _SHORT, [8] * spp),
+            (259, _SHORT, [8]),          # deflate
+            (262, _SHORT, [2]),          # RGB
+            (277, _SHORT, [spp]),
+            (284, _SHORT, [1]),          # canais intercalados
+            (322, _LONG, [t]),
+            (323, _LONG, [t]),
+            (324, _LONG8, offsets),
+            (325, _LONG8, counts),
+        ]
+        if self.mode == "RGBA":
+            campos.append((338, _SHORT, [2]))   # alfa não pré-multiplicado
+
+        # Valores que não cabem nos 8 bytes da entrada vão antes do IFD.
+        entradas = []
+        for tag, tipo, valores in campos:
+            formato = {_SHORT: "H", _LONG: "I", _LONG8: "Q"}[tipo]
+            dados = array(formato, valores).tobytes() if isinstance(valores, list) else valores.tobytes()
+            if len(dados) <= 8:
+                entradas.append((tag, tipo, len(valores), dados.ljust(8, b"\x00")))
+            else:
+                if self._f.tell() % 2:
+                    self._f.write(b"\x00")
+                entradas.append((tag, tipo, len(valores), struct.pack("<Q", self._f.tell())))
+                self._f.write(dados)
+
+        if self._f.tell() % 2:
+            self._f.write(b"\x00")
+        ifd = self._f.tell()
+        self._f.write(struct.pack("<Q", len(entradas)))
+        for tag, tipo, quantidade, valor in entradas:
+            self._f.write(struct.pack("<HHQ", tag, tipo, quantidade) + valor)
+        self._f.write(struct.pack("<Q", 0))
+        self._f.seek(8)
+        self._f.write(struct.pack("<Q", ifd))
+        self._f.close()
+
+
+#   CORTA AS SEÇÕES EM BLOCOS, NA ORDEM DA LINHA
+class _TileCutter:
+    """
+    Recebe as imagens das seções em sequência e grava no TIFF cada faixa de blocos
+    (coluna, na horizontal; linha, na vertical) assim que ela está completa. Guarda
+    só a sobra que ainda não completa uma faixa (menos de um bloco).
+    """
+
+    def __init__(self, writer, direction):
+        self.writer = writer
+        self.horizontal = direction == "horizontal"
+        self._sobra = None
+        self._faixa = 0
+        self.width = 0
+        self.height = 0
+
+    def _comprimento(self, image):
+        return image.width if self.horizontal else image.height
+
+    def add(self, image):
+        if self.horizontal:
+            self.width += image.width
+            self.height = max(self.height, image.height)
+        else:
+            self.height += image.height
+            self.width = max(self.width, image.width)
+        if self._sobra is not None:
+            image = self._juntar(self._sobra, image)
+        t = self.writer.tile_size
+        completas = self._comprimento(image) // t
+        for i in range(completas):
+            self._gravar_faixa(image, i * t)
+        resto = completas * t
+        if resto < self._comprimento(image):
+            caixa = (resto, 0, image.width, image.height) if self.horizontal else (0, resto, image.width, image.height)
+            self._sobra = image.crop(caixa)
+        else:
+            self._sobra = None
+
+    def _juntar(self, a, b):
+        if self.horizontal:
+            junta = Image.new(b.mode, (a.width + b.width, max(a.height, b.height)))
+            junta.paste(a, (0, 0))
+            junta.paste(b, (a.width, 0))
+        else:
+            junta = Image.new(b.mode, (max(a.width, b.width), a.height + b.height))
+            junta.paste(a, (0, 0))
+            junta.paste(b, (0, a.height))
+        return junta
+
+    def _gravar_faixa(self, image, inicio):
+        # O crop além da borda completa o bloco com pixels transparentes (zero).
+        t = self.writer.tile_size
+        outro_lado = image.height if self.horizontal else image.width
+        for j in range(-(-outro_lado // t)):
+            if self.horizontal:
+                self.writer.write_tile(self._faixa, j, image.crop((inicio, j * t, inicio + t, (j + 1) * t)))
+            else:
+                self.writer.write_tile(j, self._faixa, image.crop((j * t, inicio, (j + 1) * t, inicio + t)))
+        self._faixa += 1
+
+    def close(self):
+        if self._sobra is not None:
+            self._gravar_faixa(self._sobra, 0)
+            self._sobra = None
+        self.writer.close(self.width, self.height)
+
+
+#   IMAGENS DAS SEÇÕES, NA ORDEM DA LINHA
+def iter_section_images(sections, numbering="section", pasta=PASTA_FIGURAS,
+                        background_path=BACKGROUND_PATH, font_path=FONT_PATH, font_size=FONT_SIZE,
+                        x_positions_map=X_POSITIONS_MAP, assets=None, rules=None, avisar=print,
+                        scale=1.0):
+    """
+    Monta cada seção com o ImageComposer, uma de cada vez.
+
+    Com numbering='section', cada seção é numerada a partir de 1, como nas imagens
+    individuais; com 'continuous', a numeração continua de uma seção para a seguinte.
+    Com scale != 1, as seções (e portanto a linha inteira) são desenhadas nessa escala.
+
+    Yields:
+        tuple: (section_id, imagem da seção).
+    """
+    if numbering not in NUMBERINGS:
+        raise ValueError(f"Numeração inválida: '{numbering}'. Use {' ou '.join(NUMBERINGS)}.")
+    table = AccessoryTable(pasta, x_positions_map)
+    proximo_id = 1
+    for section_id, fittings_in_section in sections:
+        composer = prepare_composer(section_id, fittings_in_section, pasta, background_path, font_path,
+                                    font_size, x_positions_map, assets, rules, avisar, table=table,
+                                    scale=scale)
+        first_id = proximo_id if numbering == "continuous" else 1
+        yield section_id, composer.assemble_duct(first_id=first_id)
+        proximo_id = first_id + len(composer.components_to_draw)
+
+
+#   GRAVA A LINHA INTEIRA EM UM ÚNICO ARQUIVO
+def render_line(sections, path, direction="horizontal", numbering="section",
+                tile_size=DEFAULT_TILE_SIZE, compress_level=6, drop_alpha=False, **kwargs):
+    """
+    Grava o desenho contínuo de todas as seções em `path` (.png, .tif ou .tiff).
+    As seções são montadas e gravadas uma a uma, na ordem recebida; os demais
+    argumentos (pasta, assets, rules, avisar, ...) são repassados a iter_section_images.
+
+    Returns:
+        tuple: (número de seções, largura, altura).
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Direção inválida: '{direction}'. Use {' ou '.join(DIRECTIONS)}.")
+    extensao = os.path.splitext(path)[1].lower()
+    if extensao not in (".png", ".tif", ".tiff"):
+        raise ValueError(f"Formato do desenho da linha não suportado: '{extensao}'. Use .png, .tif ou .tiff.")
+    if extensao == ".png" and direction == "horizontal":
+        raise ValueError("O PNG é gravado por linhas de pixels e só aceita as seções na vertical; "
+                         "para a linha na horizontal use .tif.")
+    mode = "RGB" if drop_alpha else "RGBA"
+
+    imagens = iter_section_images(sections, numbering, **kwargs)
+    primeira = next(imagens, None)
+    if primeira is None:
+        raise ValueError("Nenhuma seção para desenhar.")
+    imagens = itertools.chain([primeira], imagens)
+
+    n_secoes = 0
+    if extensao == ".png":
+        writer = PngStreamWriter(path, primeira[1].width, mode, compress_level)
+        for _, image in imagens:
+            writer.write_rows(image)
+            n_secoes += 1
+        writer.close()
+        return n_secoes, writer.width, writer.height
+
+    cutter = _TileCutter(TiledTiffWriter(path, tile_size, mode, compress_level), direction)
+    for _, image in imagens:
+        cutter.add(image.convert(mode) if image.mode != mode else image)
+        n_secoes += 1
+    cutter.close()
+    return n_secoes, cutter.width, cutter.height
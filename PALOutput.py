@@ -0,0 +1,83 @@
+from PIL import Image
+
+"""
+Opções de codificação das imagens geradas (PNG, WebP ou JPEG).
+"""
+
+FORMATS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+
+class OutputOptions:
+    """
+    Opções de saída do renderizador.
+
+    Args:
+        format (str): 'png' (padrão), 'webp' ou 'jpeg'.
+        compress_level (int): nível de compressão zlib do PNG, de 0 a 9 (padrão do Pillow: 6).
+        optimize (bool): ativa a busca de melhor compressão do PNG (mais lento).
+        quantize (int, optional): reduz a imagem a uma paleta com esse número de cores.
+                                  Os desenhos são de cores chapadas, então 64-256 cores bastam.
+        drop_alpha (bool | str): remove o canal alfa. Com 'auto', remove apenas se a
+                                 imagem for totalmente opaca. JPEG sempre remove.
+        quality (int): qualidade de WebP/JPEG (WebP com quality=100 é sem perdas).
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, format="png", compress_level=6, optimize=False, quantize=None,
+                 drop_alpha=False, quality=90):
+        format = format.lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in FORMATS:
+            raise ValueError(f"Formato de saída inválido: '{format}'. Use png, webp ou jpeg.")
+        self.format = format
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.quantize = quantize
+        self.drop_alpha = drop_alpha
+        self.quality = quality
+
+    @property
+    def extension(self):
+        return FORMATS[self.format]
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        campos = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"OutputOptions({campos})"
+
+
+#   PREPARA A IMAGEM CONFORME AS OPÇÕES
+def prepare_image(image, options):
+    """ Aplica a remoção do alfa e a quantização pedidas (retorna uma nova imagem, se necessário). """
+    # JPEG não tem canal alfa: remove sempre, mesmo com drop_alpha="auto".
+    drop_alpha = True if options.format == "jpeg" else options.drop_alpha
+    if drop_alpha == "auto":
+        drop_alpha = image.mode == "RGBA" and image.getchannel("A").getextrema() == (255, 255)
+    if drop_alpha and image.mode == "RGBA":
+        image = image.convert("RGB")
+    if options.quantize and options.format != "jpeg":
+        # FASTOCTREE é o único método do Pillow que aceita RGBA.
+        metodo = Image.Quantize.FASTOCTREE if image.mode == "RGBA" else Image.Quantize.MEDIANCUT
+        image = image.quantize(colors=options.quantize, method=metodo)
+    return image
+
+
+#   CODIFICA E GRAVA A IMAGEM
+def encode_image(image, fp, options=None):
+    """
+    Codifica a imagem em `fp` (caminho ou arquivo binário) conforme as opções.
+    Sem opções, o resultado é o mesmo de image.save(fp) em PNG.
+    """
+    options = options or OutputOptions()
+    image = prepare_image(image, options)
+    if options.format == "png":
+        image.save(fp, format="PNG", compress_level=options.compress_level,
+                   optimize=options.optimize)
+    elif options.format == "webp":
+        image.save(fp, format="WEBP", quality=options.quality,
+                   lossless=options.quality >= 100)
+    else:
+        image.save(fp, format="JPEG", quality=options.quality)
@@ -0,0 +1,122 @@
+import math
+import time
+import contextlib
+from collections import defaultdict
+
+"""
+Instrumentação opcional das etapas da renderização (tempo por etapa e por tipo de acessório).
+"""
+
+#   ETAPAS MEDIDAS
+# template_copy: seções que reaproveitam um layout já composto (sem alpha_composite).
+STAGES = ("init", "add_component", "alpha_composite", "template_copy", "labels", "save")
+
+
+#   PERCENTIL (método do posto mais próximo)
+def percentile(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    posto = math.ceil(p / 100.0 * len(valores_ordenados))
+    return valores_ordenados[max(0, min(len(valores_ordenados), posto) - 1)]
+
+
+def _stats(valores):
+    ordenados = sorted(valores)
+    return {
+        "count": len(ordenados),
+        "total_s": sum(ordenados),
+        "p50_ms": 1000 * percentile(ordenados, 50),
+        "p95_ms": 1000 * percentile(ordenados, 95),
+    }
+
+
+class StageProfiler:
+    """
+    Coleta os tempos de cada etapa. Cada medição é repassada aos callbacks
+    registrados, no formato callback(stage, seconds, accessory_type, section_id).
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, callbacks=()):
+        self.callbacks = list(callbacks)
+        self.samples = []
+        self.section_id = None
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    #  REGISTRA UMA MEDIÇÃO
+    def record(self, stage, seconds, accessory_type=None, section_id=None):
+        if section_id is None:
+            section_id = self.section_id
+        self.samples.append((stage, seconds, accessory_type, section_id))
+        for callback in self.callbacks:
+            callback(stage, seconds, accessory_type, section_id)
+
+    @contextlib.contextmanager
+    def measure(self, stage, accessory_type=None):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - inicio, accessory_type)
+
+    #  JUNTA AS MEDIÇÕES DE OUTRO PROCESSO
+    def merge(self, samples):
+        for sample in samples:
+            self.record(*sample)
+
+    #  RESUMO
+    def summary(self):
+        """
+        Returns:
+            dict: {"stages": {etapa: estatísticas},
+                   "by_type": {tipo: {etapa: estatísticas}},
+                   "slowest_sections": [(section_id, segundos), ...]}
+        """
+        por_etapa = defaultdict(list)
+        por_tipo = defaultdict(lambda: defaultdict(list))
+        por_secao = defaultdict(float)
+        for stage, seconds, accessory_type, section_id in self.samples:
+            por_etapa[stage].append(seconds)
+            if accessory_type is not None:
+                por_tipo[accessory_type][stage].append(seconds)
+            if section_id is not None:
+                por_secao[section_id] += seconds
+        return {
+            "stages": {stage: _stats(v) for stage, v in por_etapa.items()},
+            "by_type": {tipo: {stage: _stats(v) for stage, v in etapas.items()}
+                        for tipo, etapas in sorted(por_tipo.items())},
+            "slowest_sections": sorted(por_secao.items(), key=lambda item: -item[1])[:10],
+        }
+
+    def report(self):
+        """ Texto com p50/p95 por etapa, por tipo de acessório e as seções mais lentas. """
+        resumo = self.summary()
+        linhas = ["Tempo por etapa:",
+                  f"  {'etapa':<18} {'n':>7} {'total (s)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9}"]
+        for stage in STAGES:
+            s = resumo["stages"].get(stage)
+            if s:
+                linhas.append(f"  {stage:<18} {s['count']:>7} {s['total_s']:>10.3f} "
+                              f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f}")
+        if resumo["by_type"]:
+            linhas.append("Tempo por tipo de acessório (alpha_composite + labels):")
+            ordem = sorted(resumo["by_type"].items(),
+                           key=lambda item: -sum(s["total_s"] for s in item[1].values()))
+            for tipo, etapas in ordem:
+                partes = " ".join(f"{stage} p50={s['p50_ms']:.2f}ms p95={s['p95_ms']:.2f}ms"
+                                  for stage, s in etapas.items() if stage in ("alpha_composite", "labels"))
+                linhas.append(f"  {tipo}: {partes}")
+        if resumo["slowest_sections"]:
+            linhas.append("Seções mais lentas:")
+            for section_id, seconds in resumo["slowest_sections"]:
+                linhas.append(f"  {section_id}: {1000 * seconds:.1f} ms")
+        return "\n".join(linhas)
+
+
+#   MEDIÇÃO OPCIONAL (sem custo quando não há profiler)
+def measure(profiler, stage, accessory_type=None):
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.measure(stage, accessory_type)
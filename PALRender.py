@@ -0,0 +1,387 @@
+import io
+import os
+import contextlib
+from itertools import islice
+from collections import deque
+
+from PALAssets import AssetCache, get_default_cache, scaled_length
+from PALInput import iter_sections, rows_from_columns
+from PALRules import get_default_rules
+from PALIncremental import Manifest, SectionFingerprinter
+from PALOutput import OutputOptions, encode_image
+from PALProfile import StageProfiler, measure
+from PALResolve import AccessoryTable
+from PALTesteNumerosMain import (
+    compose_section, prepare_composer, PASTA_FIGURAS, BACKGROUND_PATH, FONT_PATH, FONT_SIZE, X_POSITIONS_MAP,
+)
+
+"""
+Renderização das seções: em lote (arquivos, em série ou em paralelo) e em memória (bytes).
+"""
+
+#   CAMINHOS ABSOLUTOS PARA A API EM MEMÓRIA (independentes do diretório atual)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_PASTA = os.path.join(PROJECT_DIR, PASTA_FIGURAS)
+PROJECT_BACKGROUND = os.path.join(PROJECT_DIR, BACKGROUND_PATH)
+
+#   NOME DO ARQUIVO DE SAÍDA
+def output_filename_for(section_id, output_dir="", extension=".png"):
+    return os.path.join(output_dir, f"Pipe_Finished_ID_{section_id}{extension}")
+
+
+#   RENDERIZA E SALVA UMA SEÇÃO
+def _render_section_job(section_id, fittings_in_section, config):
+    """
+    Monta e salva uma seção. Não imprime nada: devolve os avisos, o nome do arquivo
+    gerado, a mensagem de erro (ou None) e as medições de tempo, para que o processo
+    principal imprima tudo na mesma ordem do modo em série.
+    """
+    avisos = []
+    profiler = StageProfiler() if config["profile"] else None
+    try:
+        final_image = compose_section(section_id, fittings_in_section, avisar=avisos.append,
+                                      profiler=profiler, **_compose_kwargs(config))
+        output_filename = _save(section_id, final_image, config, profiler)
+        return section_id, avisos, output_filename, None, _samples(profiler)
+    except Exception as e:
+        return section_id, avisos, None, str(e), _samples(profiler)
+
+
+#   RENDERIZA E SALVA UM LOTE DE SEÇÕES
+def _render_batch_job(batch, config):
+    """
+    Renderiza uma lista de pares (section_id, fittings) e devolve os resultados no
+    formato de _render_section_job, na mesma ordem. Com o backend "numpy", os shapes
+    de todas as seções do lote são compostos juntos (PALBatch).
+    """
+    if config["backend"] != "numpy":
+        return [_render_section_job(section_id, fittings_in_section, config)
+                for section_id, fittings_in_section in batch]
+
+    from PALBatch import assemble_batch
+    profiler = StageProfiler() if config["profile"] else None
+    resultados = [None] * len(batch)
+    preparados = []
+    for i, (section_id, fittings_in_section) in enumerate(batch):
+        avisos = []
+        try:
+            composer = prepare_composer(section_id, fittings_in_section, avisar=avisos.append,
+                                        profiler=profiler, **_compose_kwargs(config))
+            preparados.append((i, section_id, avisos, composer))
+        except Exception as e:
+            resultados[i] = (section_id, avisos, None, str(e), [])
+
+    try:
+        imagens = assemble_batch([composer for _, _, _, composer in preparados])
+    except Exception:
+        # Uma seção com problema não derruba o lote: cada seção é montada de novo,
+        # sozinha, e só as que falharem de fato são relatadas.
+        imagens = []
+        for _, _, _, composer in preparados:
+            try:
+                composer.background = None
+                imagens.append(composer.assemble_duct())
+            except Exception as e:
+                imagens.append(e)
+    for (i, section_id, avisos, _), image in zip(preparados, imagens):
+        try:
+            if isinstance(image, Exception):
+                raise image
+            if profiler is not None:
+                profiler.section_id = section_id
+            output_filename = _save(section_id, image, config, profiler)
+            resultados[i] = (section_id, avisos, output_filename, None, [])
+        except Exception as e:
+            resultados[i] = (section_id, avisos, None, str(e), [])
+    # As medições do lote são entregues junto com o último resultado.
+    if resultados:
+        resultados[-1] = resultados[-1][:4] + (_samples(profiler),)
+    return resultados
+
+
+def _compose_kwargs(config):
+    return {
+        "pasta": config["pasta"],
+        "background_path": config["background_path"],
+        "font_path": config["font_path"],
+        "font_size": config["font_size"],
+        "x_positions_map": config["x_positions_map"],
+        "rules": config["rules"],
+        "table": config["table"],
+        "scale": config["scale"],
+    }
+
+
+def _save(section_id, image, config, profiler):
+    options = config["output"]
+    output_filename = output_filename_for(section_id, config["output_dir"], options.extension)
+    with measure(profiler, "save"):
+        encode_image(image, output_filename, options)
+    return output_filename
+
+
+def _samples(profiler):
+    return profiler.samples if profiler is not None else []
+
+
+#   AQUECIMENTO DO WORKER
+def _init_worker(config):
+    """
+    Executado uma vez em cada processo: decodifica o fundo, a fonte e todos os
+    shapes de `pasta` (nas duas orientações) no cache do processo. Com o atlas, as
+    figuras são apenas mapeadas do arquivo gerado pelo processo principal.
+    """
+    # O aviso de fonte já foi impresso pelo processo principal.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if config["atlas"]:
+            get_default_cache().use_atlas(config["pasta"], rebuild=False)
+        get_default_cache().warm(config["pasta"], config["background_path"],
+                                 config["font_path"], config["font_size"], config["scale"])
+
+
+#   RELATA O RESULTADO DE UMA SEÇÃO
+def _report(result):
+    section_id, avisos, output_filename, erro = result[:4]
+    for aviso in avisos:
+        print(aviso)
+    if erro is None:
+        print(f"Imagem gerada e salva como '{output_filename}'")
+    else:
+        print(f"Erro ao gerar a imagem do ID {section_id}: {erro}")
+
+
+#   RENDERIZA TODAS AS SEÇÕES
+def render_all(sections, workers=1, pasta=PASTA_FIGURAS, background_path=BACKGROUND_PATH,
+               font_path=FONT_PATH, font_size=FONT_SIZE, output_dir="", rules=None,
+               x_positions_map=X_POSITIONS_MAP, incremental=False, output=None, profiler=None,
+               atlas=False, backend="pillow", batch_size=None, scale=1.0):
+    """
+    Renderiza e salva cada seção de `sections` (iterável de pares (section_id, fittings)).
+
+    Com workers > 1 a montagem e a codificação PNG são feitas em processos separados;
+    os arquivos e as mensagens no console são os mesmos do modo em série, na mesma ordem.
+    Uma falha em uma seção é relatada sem interromper as demais.
+
+    Com incremental=True, as seções cuja impressão digital (acessórios, posições X,
+    regras, fonte e figuras usadas) coincide com a do manifesto em `output_dir`, e
+    cuja imagem ainda existe, não são renderizadas novamente.
+
+    `output` (OutputOptions) define o formato e a compressão das imagens (padrão: PNG).
+
+    Com um `profiler` (PALProfile.StageProfiler), as medições de cada seção (inclusive
+    as feitas nos workers) são reunidas nele, e seus callbacks são chamados no processo principal.
+
+    Com atlas=True, as figuras de `pasta` são lidas do atlas pré-decodificado (PALAtlas),
+    gerado de novo antes da renderização se alguma figura mudou.
+
+    Com backend="numpy", as seções são montadas em lotes de `batch_size` (PALBatch),
+    com o mesmo resultado do backend padrão ("pillow"); requer NumPy.
+
+    Com scale != 1 (ex.: 0.25), as imagens são desenhadas diretamente nessa escala,
+    com os shapes redimensionados uma vez por processo (prévias e miniaturas).
+
+    Returns:
+        list: tuplas (section_id, output_filename ou None, erro ou None).
+    """
+    rules = rules if rules is not None else get_default_rules()
+    output = output or OutputOptions()
+    # Figura e posição de cada tipo resolvidas uma vez por execução (uma listagem da pasta).
+    table = AccessoryTable(pasta, x_positions_map)
+    config = {
+        "pasta": pasta,
+        "background_path": background_path,
+        "font_path": font_path,
+        "font_size": font_size,
+        "output_dir": output_dir,
+        "rules": rules,
+        "x_positions_map": x_positions_map,
+        "output": output,
+        "profile": profiler is not None,
+        "atlas": atlas,
+        "backend": backend,
+        "batch_size": 1,
+        "table": table,
+        "scale": scale,
+    }
+    if backend == "numpy":
+        # Falha logo se o NumPy não estiver instalado, antes de abrir os workers.
+        from PALBatch import DEFAULT_BATCH_SIZE
+        config["batch_size"] = batch_size or DEFAULT_BATCH_SIZE
+    elif backend != "pillow":
+        raise ValueError(f"Backend desconhecido: '{backend}' (use 'pillow' ou 'numpy').")
+    if atlas:
+        get_default_cache().use_atlas(pasta)
+    if scale <= 0:
+        raise ValueError(f"Escala inválida: {scale} (deve ser maior que zero).")
+    # Carrega a fonte no processo principal para que o aviso (se houver) apareça uma vez só.
+    get_default_cache().get_font(font_path, scaled_length(font_size, scale, minimum=1))
+
+    resultados = []
+    manifest = None
+    impressoes = {}
+    ignoradas = 0
+
+    if incremental:
+        manifest = Manifest(output_dir)
+        # A escala só entra na impressão digital quando usada (as existentes continuam válidas).
+        extra = output.to_dict() if scale == 1 else dict(output.to_dict(), scale=scale)
+        fingerprinter = SectionFingerprinter(pasta, background_path, font_path, font_size,
+                                             x_positions_map, rules, extra=extra)
+
+        def selecionar(sections):
+            nonlocal ignoradas
+            for section_id, fittings_in_section in sections:
+                impressao = fingerprinter.fingerprint(fittings_in_section)
+                if manifest.is_current(section_id, impressao,
+                                       output_filename_for(section_id, output_dir, output.extension)):
+                    ignoradas += 1
+                    continue
+                impressoes[section_id] = impressao
+                yield section_id, fittings_in_section
+
+        sections = selecionar(sections)
+
+    def resolver(sections):
+        # Registra os tipos no processo principal (os workers têm cópias da tabela).
+        for section_id, fittings_in_section in sections:
+            table.resolve_all(linha["AccessoryType"] for linha in fittings_in_section)
+            yield section_id, fittings_in_section
+
+    def concluir(result):
+        _report(result)
+        if profiler is not None:
+            profiler.merge(result[4])
+        resultados.append((result[0], result[2], result[3]))
+        impressao = impressoes.pop(result[0], None)
+        if manifest is not None and result[3] is None:
+            manifest.update(result[0], impressao)
+
+    try:
+        _render_sections(resolver(sections), workers, config, concluir)
+        # Resumo único, no fim, de todos os tipos sem figura ou fora do mapa de posições X.
+        problemas = table.problems()
+        if problemas:
+            print(f"Aviso: {len(problemas)} tipo(s) de acessório com problema:")
+            for problema in problemas:
+                print(f"  {problema}")
+    finally:
+        if manifest is not None:
+            manifest.save()
+            print(f"{ignoradas} seção(ões) sem alterações não foram renderizadas novamente.")
+    return resultados
+
+
+#   LAÇO DE RENDERIZAÇÃO (EM SÉRIE OU EM PARALELO)
+def _render_sections(sections, workers, config, concluir):
+    batches = _batches(sections, config["batch_size"])
+    if workers is None or workers <= 1:
+        for batch in batches:
+            for result in _render_batch_job(batch, config):
+                concluir(result)
+        return
+
+    # Importado só aqui: multiprocessing pesa na partida de execuções em série.
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Mantém um número limitado de lotes em andamento para não materializar toda a entrada.
+    max_pendentes = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config,)) as executor:
+        pendentes = deque()
+
+        def concluir_proximo():
+            batch, future = pendentes.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                # Ex.: o processo do worker morreu; relata apenas as seções deste lote.
+                results = [(section_id, [], None, str(e), []) for section_id, _ in batch]
+            for result in results:
+                concluir(result)
+
+        for batch in batches:
+            pendentes.append((batch, executor.submit(_render_batch_job, batch, config)))
+            if len(pendentes) >= max_pendentes:
+                concluir_proximo()
+        while pendentes:
+            concluir_proximo()
+
+
+def _batches(sections, batch_size):
+    iterador = iter(sections)
+    while True:
+        batch = list(islice(iterador, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+#   PRÉ-CARREGA UM CONJUNTO DE RECURSOS
+def preload_assets(pasta=PROJECT_PASTA, background_path=PROJECT_BACKGROUND, font_path=FONT_PATH,
+                   font_size=FONT_SIZE, memory_limit=None, atlas=False, rebuild_atlas=True, scale=1.0):
+    """
+    Cria um AssetCache já aquecido (fundo, fonte e todos os shapes), para ser
+    passado a render_section/render_sections e reaproveitado entre requisições.
+    Com atlas=True, as figuras vêm do atlas pré-decodificado de `pasta` (PALAtlas).
+    Com scale != 1, aquece também os shapes redimensionados nessa escala.
+    """
+    assets = AssetCache() if memory_limit is None else AssetCache(memory_limit)
+    if atlas:
+        assets.use_atlas(pasta, rebuild=rebuild_atlas)
+    assets.warm(pasta, background_path, font_path, font_size)
+    if scale != 1:
+        assets.warm(pasta, background_path, font_path, font_size, scale)
+    return assets
+
+
+#   RENDERIZA UMA SEÇÃO EM MEMÓRIA
+def render_section(fittings, options=None, assets=None, section_id=None, pasta=PROJECT_PASTA,
+                   background_path=PROJECT_BACKGROUND, font_path=FONT_PATH, font_size=FONT_SIZE,
+                   rules=None, x_positions_map=X_POSITIONS_MAP, avisar=None, scale=1.0):
+    """
+    Monta uma seção e devolve a imagem codificada, sem arquivos temporários
+    e sem mudar o diretório de trabalho.
+
+    Args:
+        fittings (list): registros de acessórios da seção.
+        options (OutputOptions, optional): formato e compressão (padrão: PNG).
+        assets (AssetCache, optional): recursos já carregados (ver preload_assets).
+        section_id (optional): usado apenas nos avisos; por padrão, o IdPipeSection do primeiro registro.
+        avisar (callable, optional): recebe os avisos de imagens não encontradas (padrão: ignorados).
+        scale (float, optional): escala do desenho (ex.: 0.25 para uma prévia).
+
+    Returns:
+        memoryview: os bytes da imagem (sem cópia do buffer interno).
+    """
+    options = options or OutputOptions()
+    if section_id is None and fittings:
+        section_id = fittings[0].get("IdPipeSection")
+    image = compose_section(
+        section_id, fittings,
+        pasta=pasta,
+        background_path=background_path,
+        font_path=font_path,
+        font_size=font_size,
+        x_positions_map=x_positions_map,
+        assets=assets,
+        rules=rules,
+        avisar=avisar or (lambda mensagem: None),
+        scale=scale,
+    )
+    buffer = io.BytesIO()
+    encode_image(image, buffer, options)
+    return buffer.getbuffer()
+
+
+#   RENDERIZA VÁRIAS SEÇÕES EM MEMÓRIA
+def render_sections(records, options=None, assets=None, sort=True, **kwargs):
+    """
+    Agrupa os registros (lista de registros ou formato colunar do input.json) por
+    IdPipeSection e gera pares (section_id, memoryview) à medida que cada seção fica pronta.
+    Os demais argumentos são os de render_section.
+    """
+    if isinstance(records, dict):
+        records = rows_from_columns(records)
+    for section_id, fittings_in_section in iter_sections(records, sort=sort):
+        yield section_id, render_section(fittings_in_section, options=options, assets=assets,
+                                         section_id=section_id, **kwargs)
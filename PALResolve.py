@@ -0,0 +1,84 @@
+import os
+
+"""
+Resolução antecipada dos tipos de acessório: cada tipo distinto é associado uma única vez
+à sua figura e à sua posição X, a partir de uma única listagem da pasta de figuras.
+Não importa PIL: também é usada pela validação da entrada.
+"""
+
+
+class AccessoryTable:
+    """
+    Tabela {tipo: (caminho da figura, posição X)} montada sob demanda, sem consultar o
+    disco por acessório. Registra os tipos sem figura e os tipos sem posição no mapa.
+
+    Args:
+        pasta (str): pasta das figuras (listada uma vez, na criação da tabela).
+        x_positions_map (dict): posição X de cada tipo.
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, pasta, x_positions_map):
+        self.pasta = pasta
+        self.x_positions_map = x_positions_map
+        try:
+            nomes = os.listdir(pasta)
+        except OSError:
+            nomes = []
+        # normcase: no Windows a comparação de nomes de arquivo não diferencia maiúsculas.
+        self._files = {os.path.normcase(nome) for nome in nomes if nome.lower().endswith(".png")}
+        self._entries = {}
+        self.missing_images = set()
+        self.unmapped = set()
+
+    #  CAMINHO DA FIGURA DE UM TIPO
+    def image_path(self, tipo):
+        return os.path.join(self.pasta, f"{tipo}.png")
+
+    def has_image(self, tipo):
+        return os.path.normcase(f"{tipo}.png") in self._files
+
+    #  RESOLVE UM TIPO
+    def resolve(self, tipo):
+        """
+        Returns:
+            tuple: (caminho da figura, posição X), ou None se o tipo não tiver figura.
+            Tipos sem posição no mapa usam X = 0 (e ficam registrados em `unmapped`).
+        """
+        try:
+            return self._entries[tipo]
+        except KeyError:
+            pass
+        if tipo not in self.x_positions_map:
+            self.unmapped.add(tipo)
+        if self.has_image(tipo):
+            entry = (self.image_path(tipo), self.x_positions_map.get(tipo, 0))
+        else:
+            self.missing_images.add(tipo)
+            entry = None
+        self._entries[tipo] = entry
+        return entry
+
+    def resolve_all(self, tipos):
+        """ Resolve todos os tipos de uma vez e retorna a própria tabela. """
+        for tipo in tipos:
+            self.resolve(tipo)
+        return self
+
+    #  TIPOS DO MAPA SEM FIGURA (ex.: erro de digitação no nome)
+    def map_keys_without_image(self):
+        return sorted(tipo for tipo in self.x_positions_map if not self.has_image(tipo))
+
+    #  RELATÓRIO CONSOLIDADO
+    def problems(self):
+        """ Uma mensagem por tipo resolvido até agora sem figura ou sem posição no mapa. """
+        mensagens = []
+        for tipo in sorted(self.missing_images | self.unmapped):
+            if tipo in self.missing_images and tipo in self.unmapped:
+                mensagens.append(f"Tipo '{tipo}' não tem imagem '{self.image_path(tipo)}' "
+                                 f"e não está no mapa de posições X.")
+            elif tipo in self.missing_images:
+                mensagens.append(f"Tipo '{tipo}' não tem imagem '{self.image_path(tipo)}'.")
+            else:
+                mensagens.append(f"Tipo '{tipo}' não está no mapa de posições X (usado X = 0).")
+        return mensagens
@@ -0,0 +1,135 @@
+import os
+import json
+
+"""
+Regras declarativas de posicionamento (etiqueta, deslocamento X e Y) por tipo de acessório.
+"""
+
+#   ARQUIVO PADRÃO DE REGRAS
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regras_layout.json")
+
+EFFECTS = ("label_below", "x_offset", "y_offset")
+
+
+class RuleSet:
+    """
+    Tabela de regras compilada uma única vez.
+
+    Cada regra é um dicionário com:
+        effect (str): 'label_below', 'x_offset' ou 'y_offset'.
+        accessory (str): trecho contido no AccessoryType do componente atual.
+        section_has (str | list, optional): tipo(s) que precisam existir na mesma seção.
+        location (str, optional): 'EndA' ou 'EndB'; se omitido vale para as duas pontas.
+        value (int, optional): deslocamento em pixels (x_offset / y_offset).
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, rules):
+        self.rules = []
+        for rule in rules:
+            effect = rule.get("effect")
+            if effect not in EFFECTS:
+                raise ValueError(f"Regra com efeito inválido: {rule!r}")
+            if "accessory" not in rule:
+                raise ValueError(f"Regra sem 'accessory': {rule!r}")
+            section_has = rule.get("section_has", ())
+            if isinstance(section_has, str):
+                section_has = (section_has,)
+            self.rules.append((
+                rule["accessory"],
+                frozenset(section_has),
+                rule.get("location"),
+                effect,
+                rule.get("value", 0),
+            ))
+        # Regras aplicáveis a cada AccessoryType (preenchido sob demanda).
+        self._by_type = {}
+
+    #  REGRAS DE UM TIPO
+    def rules_for_type(self, accessory_type):
+        """ Retorna as regras cujo trecho 'accessory' está contido no tipo (em cache). """
+        rules = self._by_type.get(accessory_type)
+        if rules is None:
+            rules = tuple(r for r in self.rules if r[0] in accessory_type)
+            self._by_type[accessory_type] = rules
+        return rules
+
+    #  REGRAS DE UMA SEÇÃO
+    def for_section(self, fittings_list):
+        """ Prepara a avaliação das regras para uma seção (o conjunto de tipos é montado uma vez). """
+        return SectionRules(self, {f['AccessoryType'] for f in fittings_list})
+
+    def to_dict(self):
+        return {"rules": [
+            {"effect": effect, "accessory": accessory, "section_has": sorted(section_has),
+             "location": location, "value": value}
+            for accessory, section_has, location, effect, value in self.rules
+        ]}
+
+
+class SectionRules:
+    """
+    Avaliação das regras para os acessórios de uma seção. O resultado de cada
+    (AccessoryType, Location) é calculado uma vez e reaproveitado.
+    """
+
+    def __init__(self, ruleset, section_types):
+        self.ruleset = ruleset
+        self.section_types = section_types
+        self._results = {}
+
+    def evaluate(self, accessory_type, location=None):
+        """
+        Returns:
+            tuple: (label_position, x_offset, y_offset)
+        """
+        key = (accessory_type, location)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        below = False
+        dx = dy = 0
+        for _, section_has, rule_location, effect, value in self.ruleset.rules_for_type(accessory_type):
+            if rule_location is not None and rule_location != location:
+                continue
+            if not section_has <= self.section_types:
+                continue
+            if effect == "label_below":
+                below = True
+            elif effect == "x_offset":
+                dx += value
+            else:
+                dy += value
+        result = ('below' if below else 'above', dx, dy)
+        self._results[key] = result
+        return result
+
+
+#   CARREGA AS REGRAS
+def load_rules(path=None):
+    """
+    Carrega as regras de um arquivo JSON ou YAML (YAML requer o pacote PyYAML).
+    Sem caminho, usa o regras_layout.json que acompanha o projeto.
+    """
+    path = path or DEFAULT_RULES_PATH
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Para ler regras em YAML instale o pacote PyYAML (pip install pyyaml).")
+            dados = yaml.safe_load(f)
+        else:
+            dados = json.load(f)
+    return RuleSet(dados["rules"] if isinstance(dados, dict) else dados)
+
+
+_default_rules = None
+
+
+def get_default_rules():
+    """ Retorna as regras padrão, carregadas uma única vez por processo. """
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = load_rules()
+    return _default_rules
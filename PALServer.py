@@ -0,0 +1,345 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+
+from PALCli import LOCATIONS, record_problem
+from PALInput import rows_from_columns
+from PALOutput import OutputOptions
+from PALRender import render_section, preload_assets, PROJECT_PASTA
+from PALTesteNumerosMain import FONT_PATH, FONT_SIZE
+
+"""
+Servidor HTTP local (asyncio) que recebe Fittings em JSON e devolve o PNG da seção.
+
+Uso:
+    python -m PALServer serve --port 8765 --workers 4
+
+Rotas:
+    POST /render[?section=ID][&scale=0.25]  corpo: {"Fittings": ...}, lista de registros ou
+                                            formato colunar; scale em (0, 1] gera uma prévia
+    GET  /metrics              histograma de latência e contadores em JSON
+    GET  /health
+"""
+
+#   LIMITES PADRÃO
+MAX_BODY = 16 * 1024 * 1024
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class LatencyHistogram:
+    """ Histograma cumulativo de latências (em milissegundos). """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        for i, limite in enumerate(self.buckets):
+            if ms <= limite:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def to_dict(self):
+        acumulado = 0
+        buckets = {}
+        for limite, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            acumulado += n
+            buckets[f"le_{limite}"] = acumulado
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+#   TRABALHO EXECUTADO NOS PROCESSOS DO EXECUTOR
+_worker_assets = None
+
+
+def _init_server_worker(atlas=False):
+    global _worker_assets
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # O atlas já foi gerado (se preciso) pelo processo principal.
+        _worker_assets = preload_assets(font_path=FONT_PATH, font_size=FONT_SIZE, atlas=atlas,
+                                        rebuild_atlas=False)
+
+
+def _render_job(section_id, fittings, options, scale=1.0):
+    return bytes(render_section(fittings, options=options, assets=_worker_assets,
+                                section_id=section_id, scale=scale))
+
+
+#   CHAVE DE LAYOUT (seções com os mesmos acessórios, na mesma escala, geram a mesma imagem)
+def layout_key(fittings, scale=1.0):
+    return (scale,) + tuple((linha.get("AccessoryType"), linha.get("Location")) for linha in fittings)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RenderServer:
+    """
+    Servidor de renderização.
+
+    Args:
+        workers (int): processos do executor (trabalho de CPU).
+        max_inflight (int): renderizações simultâneas no executor.
+        max_queue (int): requisições aguardando vaga; acima disso responde 503.
+        batch_window_ms (float): janela em que requisições com o mesmo layout
+                                 são agrupadas e renderizadas uma única vez.
+        atlas (bool): os workers leem as figuras do atlas pré-decodificado (PALAtlas).
+    """
+
+    #  INICIALIZAÇÃO
+    def __init__(self, workers=None, max_inflight=None, max_queue=64, batch_window_ms=5.0,
+                 options=None, atlas=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or self.workers
+        self.max_queue = max_queue
+        self.batch_window = batch_window_ms / 1000.0
+        self.options = options or OutputOptions()
+        self.atlas = atlas
+        self.histogram = LatencyHistogram()
+        self.stats = {"requests": 0, "rendered": 0, "batched": 0, "rejected": 0, "errors": 0}
+        self._waiting = 0
+        self._inflight = None
+        self._pending = {}
+        self._executor = None
+
+    #  LOTES POR LAYOUT
+    async def render(self, section_id, fittings, scale=1.0):
+        """
+        Renderiza uma seção. Requisições concorrentes com o mesmo layout, dentro da
+        janela de agrupamento, compartilham uma única renderização.
+        """
+        key = layout_key(fittings, scale)
+        future = self._pending.get(key)
+        if future is not None:
+            self.stats["batched"] += 1
+            return await asyncio.shield(future)
+
+        if self._waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "Servidor ocupado, tente novamente.")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+        self._waiting += 1
+        try:
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            async with self._inflight:
+                self._waiting -= 1
+                # A partir daqui a renderização já começou; novos pedidos iguais abrem outro lote.
+                self._pending.pop(key, None)
+                png = await loop.run_in_executor(self._executor, _render_job, section_id,
+                                                 fittings, self.options, scale)
+            self.stats["rendered"] += 1
+            future.set_result(png)
+        except BaseException as e:
+            if self._pending.get(key) is future:
+                self._pending.pop(key)
+                self._waiting -= 1
+            if not future.done():
+                future.set_exception(e)
+            # Evita o aviso de exceção não consumida quando ninguém mais aguarda o lote.
+            future.exception()
+            raise
+        return png
+
+    #  INTERPRETA O CORPO DA REQUISIÇÃO
+    @staticmethod
+    def _parse_fittings(body, query):
+        try:
+            dados = json.loads(body)
+        except ValueError as e:
+            raise HttpError(400, f"JSON inválido: {e}")
+        if isinstance(dados, dict) and "Fittings" in dados:
+            dados = dados["Fittings"]
+        if isinstance(dados, dict):
+            dados = list(rows_from_columns(dados))
+        if not isinstance(dados, list) or not dados:
+            raise HttpError(400, "Nenhum acessório (Fittings) encontrado no corpo.")
+        # Registros malformados são erro do cliente (400), não do servidor.
+        for n, linha in enumerate(dados, start=1):
+            problema = record_problem(linha)
+            if problema is not None:
+                raise HttpError(400, f"Registro {n}: {problema}")
+            if linha["Location"] not in LOCATIONS:
+                raise HttpError(400, f"Registro {n}: Location '{linha['Location']}' inválida "
+                                     f"(use {' ou '.join(LOCATIONS)}).")
+
+        secoes = {linha.get("IdPipeSection") for linha in dados}
+        section_id = query.get("section", [None])[0]
+        if section_id is not None:
+            dados = [linha for linha in dados if str(linha.get("IdPipeSection")) == section_id]
+            if not dados:
+                raise HttpError(404, f"Seção {section_id} não encontrada.")
+        elif len(secoes) > 1:
+            raise HttpError(400, "O corpo contém várias seções; indique uma com ?section=ID.")
+        else:
+            section_id = secoes.pop()
+        return section_id, dados
+
+    #  ESCALA PEDIDA (?scale=0.25 para uma prévia)
+    @staticmethod
+    def _parse_scale(query):
+        valor = query.get("scale", ["1"])[0]
+        try:
+            scale = float(valor)
+        except ValueError:
+            raise HttpError(400, f"Escala inválida: '{valor}'.")
+        if not 0 < scale <= 1:
+            raise HttpError(400, f"Escala fora do intervalo (0, 1]: {scale}.")
+        return scale
+
+    #  ATENDE UMA CONEXÃO
+    async def handle(self, reader, writer):
+        inicio = time.perf_counter()
+        status, content_type, payload = 200, "application/json", b""
+        try:
+            try:
+                cabecalho = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                writer.close()
+                return
+            linhas = cabecalho.decode("latin-1").split("\r\n")
+            metodo, alvo, _ = (linhas[0].split(" ", 2) + ["", ""])[:3]
+            headers = {}
+            for linha in linhas[1:]:
+                if ":" in linha:
+                    nome, valor = linha.split(":", 1)
+                    headers[nome.strip().lower()] = valor.strip()
+            url = urlsplit(alvo)
+
+            if url.path == "/health":
+                payload = b'{"status": "ok"}'
+            elif url.path == "/metrics":
+                payload = json.dumps(self.metrics()).encode("utf-8")
+            elif url.path == "/render":
+                if metodo != "POST":
+                    raise HttpError(405, "Use POST.")
+                try:
+                    tamanho = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    raise HttpError(400, "Content-Length inválido.")
+                if tamanho < 0:
+                    raise HttpError(400, "Content-Length inválido.")
+                if tamanho > MAX_BODY:
+                    raise HttpError(413, "Corpo muito grande.")
+                body = await reader.readexactly(tamanho)
+                self.stats["requests"] += 1
+                query = parse_qs(url.query)
+                section_id, fittings = self._parse_fittings(body, query)
+                payload = await self.render(section_id, fittings, self._parse_scale(query))
+                content_type = "image/png" if self.options.format == "png" else f"image/{self.options.format}"
+                self.histogram.observe((time.perf_counter() - inicio) * 1000)
+            else:
+                raise HttpError(404, "Rota não encontrada.")
+        except HttpError as e:
+            status = e.status
+            payload = json.dumps({"erro": str(e)}, ensure_ascii=False).encode("utf-8")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            self.stats["errors"] += 1
+            status = 500
+            payload = json.dumps({"erro": str(e)}, ensure_ascii=False).encode("utf-8")
+
+        resposta = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    "Connection: close"]
+        if status == 503:
+            resposta.append("Retry-After: 1")
+        try:
+            writer.write(("\r\n".join(resposta) + "\r\n\r\n").encode("latin-1") + payload)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def metrics(self):
+        return {
+            "latency_ms": self.histogram.to_dict(),
+            "waiting": self._waiting,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            **self.stats,
+        }
+
+    #  EXECUTA O SERVIDOR
+    async def serve(self, host="127.0.0.1", port=8765):
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        # O aviso de fonte (se houver) aparece uma vez, no processo principal.
+        from PALAssets import get_default_cache
+        get_default_cache().get_font(FONT_PATH, FONT_SIZE)
+        if self.atlas:
+            from PALAtlas import open_atlas
+            open_atlas(PROJECT_PASTA)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_server_worker,
+                                             initargs=(self.atlas,))
+        try:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Servidor de renderização em http://{host}:{port} "
+                  f"({self.workers} worker(s), até {self.max_inflight} em andamento)")
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m PALServer",
+                                     description="Servidor local de renderização dos dutos.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    serve = sub.add_parser("serve", help="Inicia o servidor HTTP.")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=None,
+                       help="Processos de renderização (padrão: número de CPUs).")
+    serve.add_argument("--max-inflight", type=int, default=None,
+                       help="Renderizações simultâneas (padrão: número de workers).")
+    serve.add_argument("--max-queue", type=int, default=64,
+                       help="Requisições em espera antes de responder 503 (padrão: 64).")
+    serve.add_argument("--batch-window-ms", type=float, default=5.0,
+                       help="Janela para agrupar requisições com o mesmo layout (padrão: 5 ms).")
+    serve.add_argument("--compress-level", type=int, default=6)
+    serve.add_argument("--atlas", action="store_true",
+                       help="Lê as figuras do atlas pré-decodificado (gerado de novo se alguma figura mudou).")
+    args = parser.parse_args(argv)
+
+    server = RenderServer(workers=args.workers, max_inflight=args.max_inflight,
+                          max_queue=args.max_queue, batch_window_ms=args.batch_window_ms,
+                          options=OutputOptions(compress_level=args.compress_level),
+                          atlas=args.atlas)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
-import json
-import pandas as pd
+import sys
+from PALAssets import get_default_cache, scaled_length
+from PALRules import get_default_rules
+from PALProfile import measure
+from PALResolve import AccessoryTable
+from PALConfig import (
+    PASTA_FIGURAS, BACKGROUND_PATH, FONT_PATH, FONT_SIZE, JSON_PATH, X_POSITIONS_MAP,
+)
 
 """
 Classe para compor uma imagem de fundo com múltiplos componentes (shapes) e adicionar numeração com setas.
@@ -9,107 +15,161 @@ Classe para compor uma imagem de fundo com múltiplos componentes (shapes) e adi
 class ImageComposer:
 
     #  INICIALIZAÇÃO
-    def __init__(self, background_path, font_path=None, font_size=60):
+    def __init__(self, background_path, font_path=None, font_size=60, assets=None, rules=None,
+                 profiler=None, use_templates=True, scale=1.0):
         """
         Inicializa a classe com o caminho da imagem de fundo e a fonte para numeração.
+        O fundo, os shapes e a fonte vêm do cache de recursos (assets), compartilhado
+        por padrão entre todas as instâncias do processo. As regras de posicionamento
+        (rules) são as de regras_layout.json, salvo indicação em contrário.
+        Com um profiler (PALProfile.StageProfiler), o tempo de cada etapa é registrado.
+        Com use_templates=False, os shapes são sempre compostos do zero (sem reaproveitar layouts).
+        Para ler as figuras de um atlas mapeado em memória, use assets.use_atlas(pasta) (PALAtlas).
+        Com scale != 1 (ex.: 0.25 para uma prévia), o fundo e os shapes vêm redimensionados
+        do cache e todas as medidas do layout (posições X, deslocamentos, setas e fonte),
+        que continuam expressas em pixels da resolução original, são multiplicadas pela escala.
         """
-        self._check_file_exists(background_path)
-        self.background = Image.open(background_path).convert('RGBA')
-        self.draw = ImageDraw.Draw(self.background)
-        self.components_to_draw = []
-        self.font = self._load_font(font_path, font_size)
+        if scale <= 0:
+            raise ValueError(f"Escala inválida: {scale} (deve ser maior que zero).")
+        self.scale = scale
+        self.profiler = profiler
+        self.use_templates = use_templates
+        self.background_path = background_path
+        with measure(profiler, "init"):
+            self._check_file_exists(background_path)
+            self.assets = assets if assets is not None else get_default_cache()
+            self.rules = rules if rules is not None else get_default_rules()
+            # O fundo é copiado só quando for desenhado (ver a propriedade background).
+            self._background_source = self.assets.get_background(background_path, copy=False, scale=scale)
+            self._background = None
+            self._draw = None
+            self.components_to_draw = []
+            self.font = self._load_font(font_path, scaled_length(font_size, scale, minimum=1))
+            self._font_key = (font_path, font_size, scale)
  
+    #  FUNDO E OBJETO DE DESENHO (CRIADOS SOB DEMANDA)
+    @property
+    def background(self):
+        if self._background is None:
+            self._background = self._background_source.copy()
+        return self._background
+
+    @background.setter
+    def background(self, image):
+        self._background = image
+        self._draw = None
+
+    @property
+    def draw(self):
+        if self._draw is None:
+            self._draw = ImageDraw.Draw(self.background)
+        return self._draw
+
     #  VERIFICAÇÃO DE ARQUIVO
     def _check_file_exists(self, path):
         # Verifica se um arquivo existe, levantando uma exceção se não.
         if not os.path.exists(path):
             raise FileNotFoundError(f"Arquivo '{path}' não encontrado!")
  
+    #  MEDIDA DO LAYOUT NA ESCALA DO DESENHO
+    def _px(self, value, minimum=None):
+        return scaled_length(value, self.scale, minimum)
+
     #  CARREGA A FONTE
     def _load_font(self, path, size):
-        # Tenta carregar a fonte especificada, caso contrário, usa a padrão.
-        if path:
-            try:
-                return ImageFont.truetype(path, size)
-            except (IOError, OSError) as e:
-                print(f"Aviso: Não foi possível carregar a fonte '{path}'. Usando a fonte padrão. Erro: {e}")
-        return ImageFont.load_default()
+        # Tenta carregar a fonte especificada (via cache), caso contrário, usa a padrão.
+        return self.assets.get_font(path, size)
     
-        # NOVO: Função para ajustar a posição X
+    #  AJUSTE DA POSIÇÃO X
     def _adjust_x_position(self, fittings_list, current_fitting):
         """
         Ajusta a posição X de um componente com base nos outros componentes
-        presentes na mesma seção.
+        presentes na mesma seção, conforme a tabela de regras (regras_layout.json).
         """
         x_position = current_fitting.get("x_position", 0)
-        tipos_acessorios = {f['AccessoryType'] for f in fittings_list}
-        current_type = current_fitting.get("AccessoryType")
-        
-        # Exemplo: Se há um "Flange Adapter" e o componente atual é uma "Pulling Head"
-        if "Flange Adapter" in tipos_acessorios and "Pulling Head" in current_type:
-            # Aumenta o valor de X em 200, mas apenas para o lado 'EndB' (direita)
-            if current_fitting.get("Location") == "EndA":
-                return x_position - 100
-
-        # Você pode adicionar mais regras aqui conforme a necessidade
-        # Exemplo: Se há um "Armour Pot" e o componente é um "Junction Box", ajusta Y
-        # if "Armour Pot(w eyelet)" in tipos_acessorios and "Junction Box" in current_type:
-        #     current_fitting['y_position'] = 50 # Exemplo de ajuste de Y, se necessário
-
-        return x_position
-
-
-
+        _, dx, _ = self.rules.for_section(fittings_list).evaluate(
+            current_fitting.get("AccessoryType"), current_fitting.get("Location"))
+        return x_position + dx
 
     #  REGRAS DE POSICIONAMENTO DA ETIQUETA
     def _should_label_be_below(self, fittings_list, current_fitting_type):
         """
-        Determina se a etiqueta de numeração deve ser 'below'.
- 
-        Você pode customizar essa função com qualquer regra. Por exemplo:
-        se o componente atual for um 'Colar' e a seção também contém um 'Conector'.
+        Determina se a etiqueta de numeração deve ser 'below', conforme a tabela de regras.
+        Para avaliar vários acessórios da mesma seção, prefira rules.for_section(), que
+        monta o conjunto de tipos da seção uma única vez.
         """
-        tipos_acessorios = [f['AccessoryType'] for f in fittings_list]
-        
-        # Regra de exemplo: Se o componente atual é um 'Colar de Anodo' e
-        # na mesma seção existe um 'Conector', a etiqueta deve ficar 'below'.
-        
-        rules = [
-                ("Set of Anode Collar" in current_fitting_type and "End Fitting" in tipos_acessorios),
-                ("Pull-In Collar" in current_fitting_type and "End Fitting" in tipos_acessorios),
-                ("Flange Protector" in current_fitting_type and "End Fitting" in tipos_acessorios),
-            ]
-        # Exemplo: Se for um "Flutuador" e a seção tiver mais de 3 componentes
-        # is_special_case = ("Flutuador" in current_fitting_type and len(fittings_list) > 3)
- 
-        return any(rules)
+        label_position, _, _ = self.rules.for_section(fittings_list).evaluate(current_fitting_type)
+        return label_position == 'below'
     
     #   ADICIONA COMPONENTES
-    def add_component(self, name, x_position, flip=False, component_id=None, label_position='above'):
+    def add_component(self, name, x_position, flip=False, component_id=None, label_position='above',
+                      y_offset=0, check_exists=True):
         """
         Adiciona um componente à lista para ser desenhado em uma posição X específica.
         Args:
             name (str): O caminho do arquivo do componente (shape).
-            x_position (int): A coordenada X horizontal onde o componente será colocado.
+            x_position (int): A coordenada X horizontal onde o componente será colocado
+                              (em pixels da resolução original, qualquer que seja a escala).
             flip (bool, optional): Se True, a imagem será espelhada horizontalmente.
             component_id (int, optional): O ID numérico do componente. Se None, será atribuído um ID sequencial.
             label_position (str, optional): A posição da etiqueta de numeração. Pode ser 'above' (padrão) ou 'below'.
+            y_offset (int, optional): Deslocamento vertical do componente em relação ao centro do duto.
+            check_exists (bool, optional): Se False, não confere se o arquivo existe (o chamador
+                                           já resolveu a figura, ex.: PALResolve.AccessoryTable).
         """
-        self._check_file_exists(name)
-        self.components_to_draw.append({
-            "name": name,
-            "x_position": x_position,
-            "flip": flip,
-            "id": component_id if component_id is not None else len(self.components_to_draw) + 1,
-            "label_position": label_position
-        })
+        tipo = os.path.splitext(os.path.basename(name))[0]
+        with measure(self.profiler, "add_component", tipo):
+            if check_exists:
+                self._check_file_exists(name)
+            self.components_to_draw.append({
+                "name": name,
+                "type": tipo,
+                "x_position": x_position,
+                "flip": flip,
+                "id": component_id if component_id is not None else len(self.components_to_draw) + 1,
+                "label_position": label_position,
+                "y_offset": y_offset
+            })
 
     #   CONTRUÇÃO DA SETA E NÚMERO
     def _draw_component_label_with_arrow(self, component_bbox, component_id, 
                                          label_position='above', arrow_color="black", 
                                          arrow_width=6):
+        """
+        Cola a etiqueta (seta e número) já desenhada no cache de recursos, em uma única
+        operação. A etiqueta é guardada como máscara de cobertura e colada com a cor,
+        que é a mesma operação usada pelo ImageDraw: o resultado é idêntico ao desenho direto.
+        """
         comp_x_center = (component_bbox[0] + component_bbox[2]) // 2
         comp_y_center = (component_bbox[1] + component_bbox[3]) // 2
+        key = self._font_key + (str(component_id), label_position, arrow_width)
+        sprite = self.assets.get_label(key)
+        if sprite is None:
+            sprite = self.assets.put_label(key, self._render_label_sprite(component_id, label_position,
+                                                                          arrow_width))
+        mask, (dx, dy) = sprite
+        x, y = comp_x_center + dx, comp_y_center + dy
+        self.background.paste(arrow_color, (x, y, x + mask.width, y + mask.height), mask)
+
+    #   DESENHA A ETIQUETA EM UMA MÁSCARA (UMA VEZ POR NÚMERO E POSIÇÃO)
+    def _render_label_sprite(self, component_id, label_position='above', arrow_width=6):
+        """
+        Returns:
+            tuple: (máscara "L" recortada, (dx, dy) do canto da máscara em relação ao centro do componente).
+        """
+        left, top, right, bottom = self._label_bbox((0, 0, 0, 0), component_id, label_position, arrow_width)
+        margem = 2 + self._px(arrow_width, minimum=1)
+        left, top, right, bottom = left - margem, top - margem, right + margem, bottom + margem
+        mask = Image.new('L', (right - left, bottom - top), 0)
+        self._draw_label(ImageDraw.Draw(mask), (-left, -top), component_id, label_position, 255, arrow_width)
+        bbox = mask.getbbox() or (0, 0, 1, 1)
+        return mask.crop(bbox), (left + bbox[0], top + bbox[1])
+
+    def _draw_label(self, draw, center, component_id, label_position='above', arrow_color="black",
+                    arrow_width=6):
+        comp_x_center, comp_y_center = center
+        px = self._px
+        arrow_width = px(arrow_width, minimum=1)
         text_to_draw = str(component_id)
         text_bbox = self.font.getbbox(text_to_draw)
         text_width = text_bbox[2] - text_bbox[0]
@@ -119,172 +179,231 @@ class ImageComposer:
 
         if label_position == 'below': # EM BAIXO
             # Posiciona a seta e o texto abaixo do componente
-            arrow_start_y = comp_y_center + 140 # Um pequeno offset abaixo do centro do componente
-            arrow_end_y = comp_y_center + 230 # Posição final da seta
-            text_y = arrow_end_y + 25 # Posição do texto abaixo da seta
+            arrow_start_y = comp_y_center + px(140) # Um pequeno offset abaixo do centro do componente
+            arrow_end_y = comp_y_center + px(230) # Posição final da seta
+            text_y = arrow_end_y + px(25) # Posição do texto abaixo da seta
  
             # Desenha a linha da seta
-            self.draw.line([(comp_x_center, arrow_start_y), (comp_x_center, arrow_end_y)],
+            draw.line([(comp_x_center, arrow_start_y), (comp_x_center, arrow_end_y)],
                            fill=arrow_color, width=arrow_width)
             
             # Desenha a ponta da seta (apontando para baixo)
             arrowhead = [
-                (comp_x_center - 10, arrow_start_y),
-                (comp_x_center + 10, arrow_start_y),
-                (comp_x_center, arrow_start_y - 10)
+                (comp_x_center - px(10), arrow_start_y),
+                (comp_x_center + px(10), arrow_start_y),
+                (comp_x_center, arrow_start_y - px(10))
             ]
-            self.draw.polygon(arrowhead, fill=arrow_color)
+            draw.polygon(arrowhead, fill=arrow_color)
             
             # Desenha o texto (o número do anel)
-            self.draw.text((comp_x_center - (text_width // 2), text_y),
+            draw.text((comp_x_center - (text_width // 2), text_y),
                            text_to_draw, fill=arrow_color, font=self.font)
  
         else: # 'above' EM CIMA
             # Posiciona a seta e o texto acima do componente
-            arrow_start_y = comp_y_center - 160 # Um pequeno offset acima do centro do componente
-            arrow_end_y = comp_y_center - 240 # Posição final da seta
-            text_y = arrow_end_y - text_height - 25 # Posição do texto acima da seta
+            arrow_start_y = comp_y_center - px(160) # Um pequeno offset acima do centro do componente
+            arrow_end_y = comp_y_center - px(240) # Posição final da seta
+            text_y = arrow_end_y - text_height - px(25) # Posição do texto acima da seta
  
             # Desenha a linha da seta
-            self.draw.line([(comp_x_center, arrow_start_y), (comp_x_center, arrow_end_y)],
+            draw.line([(comp_x_center, arrow_start_y), (comp_x_center, arrow_end_y)],
                            fill=arrow_color, width=arrow_width)
             
             # Desenha a ponta da seta (apontando para cima)
             arrowhead = [
-                (comp_x_center - 10, arrow_start_y),
-                (comp_x_center + 10, arrow_start_y),
-                (comp_x_center, arrow_start_y + 10)
+                (comp_x_center - px(10), arrow_start_y),
+                (comp_x_center + px(10), arrow_start_y),
+                (comp_x_center, arrow_start_y + px(10))
             ]
-            self.draw.polygon(arrowhead, fill=arrow_color)
+            draw.polygon(arrowhead, fill=arrow_color)
  
             # Desenha o texto
-            self.draw.text((comp_x_center - (text_width // 2), text_y),
+            draw.text((comp_x_center - (text_width // 2), text_y),
                            text_to_draw, fill=arrow_color, font=self.font)
     
-    #   MONTA O DUTO
-    def assemble_duct(self, component_y_offset=0):
+    #   ÁREA OCUPADA PELA SETA E PELO NÚMERO
+    def _label_bbox(self, component_bbox, component_id, label_position='above', arrow_width=6):
         """
-        Monta o duto sobrepondo todos os componentes na ordem em que foram adicionados.
+        Retângulo (conservador) ocupado pela etiqueta desenhada por
+        _draw_component_label_with_arrow, com as mesmas distâncias.
+        """
+        comp_x_center = (component_bbox[0] + component_bbox[2]) // 2
+        comp_y_center = (component_bbox[1] + component_bbox[3]) // 2
+        px = self._px
+        arrow_width = px(arrow_width, minimum=1)
+        text_bbox = self.font.getbbox(str(component_id))
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        half_width = max(px(10), arrow_width, text_width // 2 + abs(text_bbox[0])) + 1
+        if label_position == 'below':
+            top = comp_y_center + px(140) - px(10)
+            bottom = comp_y_center + px(230) + px(25) + text_bbox[3]
+        else:
+            top = comp_y_center - px(240) - text_height - px(25) + min(0, text_bbox[1])
+            bottom = comp_y_center - px(160) + px(10)
+        return (comp_x_center - half_width, top - arrow_width, comp_x_center + half_width + 1,
+                bottom + arrow_width)
+
+    #   ETIQUETAS COBERTAS POR SHAPES POSTERIORES?
+    def _labels_overlap_later_shapes(self, placements):
+        """
+        Indica se a etiqueta de algum componente pode ser coberta por um shape desenhado
+        depois dele. Nesse caso a ordem original (shape, etiqueta, shape, ...) precisa
+        ser mantida e a composição não pode ser reaproveitada com as etiquetas por cima.
+        """
+        for i, (info, _, bbox, _) in enumerate(placements):
+            label = self._label_bbox(bbox, info["id"], info["label_position"])
+            for _, _, _, other in placements[i + 1:]:
+                if label[0] < other[2] and other[0] < label[2] and label[1] < other[3] and other[1] < label[3]:
+                    return True
+        return False
+
+    #   POSICIONA OS COMPONENTES
+    def place_components(self, component_y_offset=0, first_id=1):
+        """
+        Ordena os componentes por X, numera-os (a partir de first_id) e calcula a
+        posição final de cada um.
+
+        Returns:
+            list: tuplas (info, recorte do shape, bbox do shape inteiro, retângulo do recorte).
         """
         self.components_to_draw.sort(key=lambda item: item['x_position'])
 
         for i, info in enumerate(self.components_to_draw):
-            info["id"] = i + 1
+            info["id"] = first_id + i
 
+        # Posição final de cada componente. O posicionamento e as etiquetas usam o shape
+        # inteiro; a composição usa só o recorte visível (retângulo sujo) do shape.
+        placements = []
         for info in self.components_to_draw:
-            component_image = Image.open(info["name"]).convert('RGBA')
-            original_x_position = info["x_position"]
+            flip = info.get("flip", False)
+            component_image = self.assets.get_shape(info["name"], flip, self.scale)
+            trimmed_image, (dx, dy) = self.assets.get_trimmed_shape(info["name"], flip, self.scale)
+            original_x_position = self._px(info["x_position"])
             x_position = original_x_position
             
-            if info.get("flip", False):
-                component_image = component_image.transpose(Image.FLIP_LEFT_RIGHT)
-                x_position = self.background.width - (original_x_position + component_image.width)
+            if flip:
+                x_position = self._background_source.width - (original_x_position + component_image.width)
             
             comp_width, comp_height = component_image.size
-            y_position = (self.background.height - comp_height) // 2 + component_y_offset
+            y_position = ((self._background_source.height - comp_height) // 2
+                          + self._px(component_y_offset + info.get("y_offset", 0)))
             component_bbox = (x_position, y_position, x_position + comp_width, y_position + comp_height)
-            self.background.alpha_composite(component_image, (x_position, y_position))
-            self._draw_component_label_with_arrow(component_bbox, info["id"], info["label_position"])
- 
+            dirty = (x_position + dx, y_position + dy,
+                     x_position + dx + trimmed_image.width, y_position + dy + trimmed_image.height)
+            placements.append((info, trimmed_image, component_bbox, dirty))
+        return placements
+
+    #   DESENHA AS ETIQUETAS
+    def draw_labels(self, placements):
+        for info, _, component_bbox, _ in placements:
+            with measure(self.profiler, "labels", info["type"]):
+                self._draw_component_label_with_arrow(component_bbox, info["id"], info["label_position"])
+
+    #   MONTA O DUTO
+    def assemble_duct(self, component_y_offset=0, first_id=1):
+        """
+        Monta o duto sobrepondo todos os componentes na ordem em que foram adicionados.
+        A numeração das etiquetas começa em first_id.
+
+        Seções com o mesmo layout (mesmos shapes, posições e espelhamento) reaproveitam a
+        composição dos shapes guardada no cache de recursos: o canvas é copiado e apenas
+        as etiquetas são desenhadas de novo.
+        """
+        placements = self.place_components(component_y_offset, first_id)
+
+        if not self.use_templates or self._labels_overlap_later_shapes(placements):
+            for info, trimmed_image, component_bbox, dirty in placements:
+                with measure(self.profiler, "alpha_composite", info["type"]):
+                    self.background.alpha_composite(trimmed_image, dirty[:2])
+                with measure(self.profiler, "labels", info["type"]):
+                    self._draw_component_label_with_arrow(component_bbox, info["id"], info["label_position"])
+            return self.background
+
+        template_key = (self.background_path, self.scale, tuple(
+            (info["name"], bbox[0], bbox[1], info.get("flip", False)) for info, _, bbox, _ in placements
+        ))
+        template = self.assets.get_template(template_key)
+        if template is not None:
+            with measure(self.profiler, "template_copy"):
+                self.background = template.copy()
+        else:
+            for info, trimmed_image, _, dirty in placements:
+                with measure(self.profiler, "alpha_composite", info["type"]):
+                    self.background.alpha_composite(trimmed_image, dirty[:2])
+            if self.assets.wants_template(template_key):
+                self.assets.put_template(template_key, self.background.copy())
+
+        self.draw_labels(placements)
         return self.background
  
-#   LÓGICA PRINCIPAL 
-def main():
-    """ Lógica principal para executar o script e gerar a imagem final. """
-    pasta = "figuras"
-    background_path = os.path.join(pasta, "Pipe.png")
-    font_path = "arial.ttf"
-    json_path = "input.json"
-    
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-        df = pd.DataFrame(dados["Fittings"])
-        #print(df)
- 
-        
-        x_positions_map = {
-            #       Tipo de linha: Flexivel            #
-            #------------------------------------------#
-            "Pulling Head": 330,    # Cabeça de Tração
-            "Streamlined Pulling Head": 330, # Cabeça de Tração Perfilada
-            "End Fitting": 430,    # Conector
-            "Flange Adapter": 330,    # Adaptador de Flanges
-            "Polymeric Clamp Protection": 380, # Protetor de Flanges
-            "Restrictor": 662,    # Vértebra
-            "Uraduct": 662, # Uraduct / Capa de linha
-            "Intermediate Stiffener": 662,   # Enrijecedor intermediário
-            "Top Stiffener(w helmet)": 640,   # Enrijecedor de topo com capacete
-            "Top Stiffener(wo helmet)": 662,    # Enrijecedor de topo sem capacete
-            "Pull-In Collar": 580,  # Kit de pull-in
-            "Stopper Collar": 1015,  # Colar batente
-            "Dead Weight Collar": 550, # Colar de peso morto
-            "Buoys for Lazy Wave": 1127,  # Flutuador de lazy wave
-            "Set of Anode Collar(end fitting)": 530,   # Colar de Anodo (conector)
-            "Set of Anode Collar(line)": 710,  # Colar de Anodo (linha) / se tiver componente maiores (930)
-            "Set of Anode Collar": 710,
-            "Anchorage Collar": 580,  # Colar de Ancoragem
-            "Anchorage Collar(inverted):": 580,  # Colar de Ancoragem Invertido
-            #       Tipo de linha: Umbilical           #
-            #------------------------------------------#
-            "Slim Pulling Head": 000,   # Cabeça de Tração Fina
-            "Anchorage Collar2": 580,  # Colar de Ancoragem Umbilical
-            "Anchorage Collar2(inverted)": 580,  # Colar de Ancoragem Umbilical
-            "Buldous Pulling Connector": 000,   # Conector de Tração Bojuda
-            "Armour Pot(w eyelet)": 430,    # Armour por com olhal
-            "Armour Pot(wo eyelet)": 430,    # Armour pot sem olhal
-            "Junction Box": 000,         #Caixa de Emenda
-        }
- 
-        for section_id in sorted(df.IdPipeSection.unique()):
-            composer = ImageComposer(background_path, font_path, font_size=60)
-            filter_pipe = df[df.IdPipeSection == section_id]
-            fittings_in_section = filter_pipe.to_dict("records")
+#   MONTA UMA SEÇÃO
+def compose_section(section_id, fittings_in_section, pasta=PASTA_FIGURAS,
+                    background_path=BACKGROUND_PATH, font_path=FONT_PATH,
+                    font_size=FONT_SIZE, x_positions_map=X_POSITIONS_MAP,
+                    assets=None, rules=None, avisar=print, profiler=None, table=None, scale=1.0):
+    """
+    Monta a imagem de uma seção (IdPipeSection) a partir da lista de acessórios.
+    Os avisos de imagens não encontradas são enviados para a função `avisar`.
+    Com `table` (PALResolve.AccessoryTable), as figuras e posições já resolvidas são
+    reaproveitadas entre as seções; sem ela, a pasta é listada uma vez para a seção.
+    Com scale != 1, a imagem é desenhada diretamente na resolução reduzida (ou ampliada).
+    """
+    composer = prepare_composer(section_id, fittings_in_section, pasta, background_path, font_path,
+                                font_size, x_positions_map, assets, rules, avisar, profiler, table,
+                                scale)
+    return composer.assemble_duct(component_y_offset=0)
+
 
-            for i, linha in enumerate(fittings_in_section):
-                tipo = linha["AccessoryType"]
-                nome_arquivo = f"{tipo}.png"
-                path_imagem = os.path.join(pasta, nome_arquivo)
-                
-                if os.path.exists(path_imagem):
-                    flip = linha["Location"] == "EndA"
-                    component_id = i + 1
-                    
-                    # 1. Obter a posição X inicial do mapa
-                    initial_x_position = x_positions_map.get(tipo, 0)
-                    
-                    # 2. Criar um dicionário temporário para passar à função
-                    # Adiciona a posição inicial e o tipo ao dicionário da linha
-                    linha["x_position"] = initial_x_position
-                    
-                    # 3. Chamar a nova função para ajustar a posição X
-                    x_position_ajustada = composer._adjust_x_position(fittings_in_section, linha)
+#   PREPARA O COMPOSITOR DE UMA SEÇÃO (COMPONENTES ADICIONADOS, AINDA NÃO MONTADO)
+def prepare_composer(section_id, fittings_in_section, pasta=PASTA_FIGURAS,
+                     background_path=BACKGROUND_PATH, font_path=FONT_PATH,
+                     font_size=FONT_SIZE, x_positions_map=X_POSITIONS_MAP,
+                     assets=None, rules=None, avisar=print, profiler=None, table=None, scale=1.0):
+    if table is None:
+        table = AccessoryTable(pasta, x_positions_map)
+    if profiler is not None:
+        profiler.section_id = section_id
+    composer = ImageComposer(background_path, font_path, font_size=font_size,
+                             assets=assets, rules=rules, profiler=profiler, scale=scale)
+    # Conjunto de tipos da seção montado uma vez e compartilhado por todos os acessórios.
+    section_rules = composer.rules.for_section(fittings_in_section)
 
-                    if composer._should_label_be_below(fittings_in_section, tipo):
-                        label_position = 'below'
-                    else:
-                        label_position = 'above'
+    for i, linha in enumerate(fittings_in_section):
+        tipo = linha["AccessoryType"]
+        # Figura e posição X resolvidas uma vez por tipo (sem consultar o disco por acessório).
+        resolvido = table.resolve(tipo)
 
-                    composer.add_component(
-                        path_imagem,
-                        x_position=x_position_ajustada, # Usar a nova posição ajustada aqui
-                        flip=flip,
-                        component_id=component_id,
-                        label_position=label_position
-                    )
-                else:
-                    print(f"Aviso Sobre o ID {section_id}: Imagem '{path_imagem}' para o componente '{tipo}' não encontrada.")
+        if resolvido is not None:
+            path_imagem, initial_x_position = resolvido
+            flip = linha["Location"] == "EndA"
+            component_id = i + 1
+            
+            # Aplicar as regras (posição da etiqueta e ajustes de X e Y)
+            label_position, dx, dy = section_rules.evaluate(tipo, linha["Location"])
+
+            composer.add_component(
+                path_imagem,
+                x_position=initial_x_position + dx, # Usar a posição ajustada aqui
+                flip=flip,
+                component_id=component_id,
+                label_position=label_position,
+                y_offset=dy,
+                check_exists=False
+            )
+        else:
+            avisar(f"Aviso Sobre o ID {section_id}: Imagem '{table.image_path(tipo)}' para o componente '{tipo}' não encontrada.")
 
-            final_image = composer.assemble_duct(component_y_offset=0)
-            output_filename = f"Pipe_Finished_ID_{section_id}.png"
-            final_image.save(output_filename)
-            print(f"Imagem gerada e salva como '{output_filename}'")
-            #final_image.show()
+    return composer
 
-    except FileNotFoundError as e:
-        print(f"Erro: {e}")
-    except Exception as e:
-        print(f"Ocorreu um erro inesperado: {e}")
+#   LÓGICA PRINCIPAL 
+def main(argv=None):
+    """
+    Lógica principal para executar o script e gerar a imagem final.
+    Equivale a `python -m PALCli render` (as opções são as mesmas).
+    """
+    from PALCli import main as cli_main
+    return cli_main(["render"] + list(sys.argv[1:] if argv is None else argv))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from PALAssets import AssetCache
+from PALBatch import assemble_batch
+from PALBench import generate_fittings
+from PALInput import group_fittings
+from PALRules import get_default_rules
+from PALTesteNumerosMain import (
+    prepare_composer, X_POSITIONS_MAP, PASTA_FIGURAS, BACKGROUND_PATH, FONT_PATH, FONT_SIZE,
+)
+
+"""
+Benchmark do backend de composição em lote (NumPy): custo por seção da montagem
+(shapes + etiquetas, sem codificar a imagem) em função do tamanho do lote, comparado
+com o backend padrão (Pillow, uma seção por vez).
+"""
+
+
+def _composers(sections, assets, rules):
+    return [prepare_composer(section_id, fittings, pasta=os.path.join(RAIZ, PASTA_FIGURAS),
+                             background_path=os.path.join(RAIZ, BACKGROUND_PATH),
+                             x_positions_map=X_POSITIONS_MAP, assets=assets, rules=rules,
+                             avisar=lambda mensagem: None)
+            for section_id, fittings in sections]
+
+
+def _assets():
+    with contextlib.redirect_stdout(sys.stderr):
+        return AssetCache().warm(os.path.join(RAIZ, PASTA_FIGURAS), os.path.join(RAIZ, BACKGROUND_PATH),
+                                 FONT_PATH, FONT_SIZE)
+
+
+def _medir(sections, rules, batch_size, repeat):
+    melhor = None
+    for _ in range(repeat):
+        # Cache novo a cada repetição: os templates de uma repetição não valem para a seguinte.
+        assets = _assets()
+        composers = _composers(sections, assets, rules)
+        inicio = time.perf_counter()
+        if batch_size is None:
+            for composer in composers:
+                composer.assemble_duct()
+        else:
+            for i in range(0, len(composers), batch_size):
+                assemble_batch(composers[i:i + batch_size])
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return 1000 * melhor / len(sections)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo por seção do backend NumPy em função do lote.")
+    parser.add_argument("--sections", type=int, default=64)
+    parser.add_argument("--fittings", type=int, default=6, help="Acessórios por seção.")
+    parser.add_argument("--layouts", type=int, nargs="+", default=[0, 4],
+                        help="Números de layouts distintos a medir (0: todas as seções diferentes).")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args(argv)
+
+    rules = get_default_rules()
+    resultados = {}
+    for layouts in args.layouts:
+        distintas = layouts or args.sections
+        base = group_fittings(generate_fittings(distintas, args.fittings))
+        # Repete os layouts para simular seções iguais (mesmos acessórios) em IDs diferentes.
+        sections = [(i, base[i % distintas][1]) for i in range(args.sections)]
+        cenario = {"pillow": _medir(sections, rules, None, args.repeat)}
+        for batch_size in args.batch_sizes:
+            cenario[f"numpy lote {batch_size}"] = _medir(sections, rules, batch_size, args.repeat)
+        resultados[f"{distintas} layouts"] = cenario
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+    for nome_cenario, cenario in resultados.items():
+        print(f"{args.sections} seções, {nome_cenario} (ms/seção, sem codificar a imagem):")
+        for nome, ms in cenario.items():
+            print(f"  {nome:<18} {ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
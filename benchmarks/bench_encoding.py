@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+import time
+import json
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from PALInput import group_fittings
+from PALOutput import OutputOptions, encode_image
+from PALTesteNumerosMain import compose_section, X_POSITIONS_MAP
+
+"""
+Benchmark da codificação das imagens: tempo e bytes por seção para cada opção de saída.
+"""
+
+PRESETS = {
+    "png (padrão)": OutputOptions(),
+    "png nível 1": OutputOptions(compress_level=1),
+    "png nível 9 + optimize": OutputOptions(compress_level=9, optimize=True),
+    "png sem alfa": OutputOptions(drop_alpha=True),
+    "png sem alfa nível 1": OutputOptions(drop_alpha=True, compress_level=1),
+    "png paleta 64": OutputOptions(quantize=64),
+    "png paleta 64 nível 1": OutputOptions(quantize=64, compress_level=1),
+    "webp sem perdas": OutputOptions(format="webp", quality=100),
+    "webp q90": OutputOptions(format="webp", quality=90),
+    "jpeg q90": OutputOptions(format="jpeg", quality=90),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das opções de codificação das imagens.")
+    parser.add_argument("--input", default=os.path.join(RAIZ, "input.json"))
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por seção e opção.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args(argv)
+
+    # As figuras são referenciadas por caminho relativo à raiz do projeto.
+    os.chdir(RAIZ)
+    with open(args.input, 'r', encoding='utf-8') as f:
+        sections = group_fittings(json.load(f)["Fittings"])
+    images = [
+        compose_section(section_id, fittings, x_positions_map=X_POSITIONS_MAP, avisar=lambda msg: None)
+        for section_id, fittings in sections
+    ]
+
+    resultados = {}
+    for nome, options in PRESETS.items():
+        tempos = []
+        tamanhos = []
+        for image in images:
+            for _ in range(args.repeat):
+                buffer = io.BytesIO()
+                inicio = time.perf_counter()
+                encode_image(image, buffer, options)
+                tempos.append(time.perf_counter() - inicio)
+            tamanhos.append(buffer.tell())
+        resultados[nome] = {
+            "ms_por_secao": 1000 * sum(tempos) / len(tempos),
+            "bytes_por_secao": sum(tamanhos) / len(tamanhos),
+            "opcoes": options.to_dict(),
+        }
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+    print(f"{'opção':<26} {'ms/seção':>10} {'KiB/seção':>10}")
+    for nome, r in resultados.items():
+        print(f"{nome:<26} {r['ms_por_secao']:10.1f} {r['bytes_por_secao'] / 1024:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PALBench import generate_fittings
+from PALInput import group_fittings
+
+"""
+Benchmark do particionamento por IdPipeSection: filtro booleano por seção (antigo)
+versus agrupamento em uma passada (pandas groupby e dicionários puros).
+"""
+
+TIPOS = ["End Fitting", "Pulling Head", "Set of Anode Collar", "Flange Adapter",
+         "Intermediate Stiffener", "Anchorage Collar"]
+
+
+#   MÉTODO ANTIGO (UMA MÁSCARA POR SEÇÃO)
+def agrupar_filtro_booleano(fittings):
+    import pandas as pd
+
+    df = pd.DataFrame(fittings)
+    return [
+        (section_id, df[df.IdPipeSection == section_id].to_dict("records"))
+        for section_id in sorted(df.IdPipeSection.unique())
+    ]
+
+
+def medir(func, *args):
+    inicio = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do agrupamento por IdPipeSection.")
+    parser.add_argument("--sections", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--max-old", type=int, default=10000,
+                        help="Maior número de seções medido com o filtro booleano (é O(seções x linhas)).")
+    args = parser.parse_args(argv)
+
+    print(f"{'seções':>8} {'filtro (s)':>12} {'groupby (s)':>12} {'dict (s)':>10}")
+    for n in args.sections:
+        # Tipos fixos: o agrupamento não depende das figuras (e PIL não é importado).
+        fittings = generate_fittings(n, 8, types=TIPOS, first_section_id=10000)
+        antigo = medir(agrupar_filtro_booleano, fittings) if n <= args.max_old else None
+        pandas_t = medir(group_fittings, fittings, True)
+        dict_t = medir(group_fittings, fittings, False)
+        antigo_txt = f"{antigo:12.4f}" if antigo is not None else f"{'-':>12}"
+        print(f"{n:>8} {antigo_txt} {pandas_t:12.4f} {dict_t:10.4f}")
+
+
+if __name__ == "__main__":
+    main()
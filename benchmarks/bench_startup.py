@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+"""
+Benchmark (e verificação) da partida a frio da linha de comando: tempo de cada
+subcomando em um processo novo e módulos pesados importados por ele.
+Termina com código 1 se validate ou list-sections importarem PIL, pandas, NumPy
+ou multiprocessing, ou se ultrapassarem o limite dado em --max-ms.
+"""
+
+HEAVY_MODULES = ("PIL", "pandas", "numpy", "multiprocessing")
+
+# Subcomandos que não podem carregar nenhum dos módulos pesados.
+LIGHT_COMMANDS = ("validate", "list-sections")
+
+# Executa o subcomando e informa, no stderr, os módulos pesados carregados.
+_SCRIPT = """
+import sys, json, contextlib, io
+import PALCli
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        PALCli.main(sys.argv[1:])
+    except SystemExit:
+        pass
+sys.stderr.write(json.dumps(sorted({m.split('.')[0] for m in sys.modules} & set(%r))))
+""" % (HEAVY_MODULES,)
+
+
+def _executar(argv, cwd):
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, "-c", _SCRIPT] + argv, cwd=cwd,
+                               capture_output=True, text=True)
+    tempo = time.perf_counter() - inicio
+    linhas = resultado.stderr.strip().splitlines()
+    return tempo, json.loads(linhas[-1]) if linhas else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de partida a frio de cada subcomando da CLI.")
+    parser.add_argument("--input", default="input.json")
+    parser.add_argument("--section", default=None,
+                        help="Seção usada em 'render' (padrão: a primeira da entrada).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Tempo máximo (mediana) aceito para validate e list-sections.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args(argv)
+
+    section = args.section
+    if section is None:
+        sys.path.insert(0, RAIZ)
+        from PALInput import iter_fittings
+        section = str(next(iter(iter_fittings(os.path.join(RAIZ, args.input))))["IdPipeSection"])
+
+    saida = tempfile.mkdtemp(prefix="pal_startup_")
+    comandos = {
+        "python (vazio)": None,
+        "validate": ["validate", "--input", args.input],
+        "list-sections": ["list-sections", "--input", args.input],
+        f"render --section {section}": ["render", "--input", args.input, "--section", section,
+                                        "--output-dir", saida],
+    }
+    resultados = {}
+    falhas = []
+    for nome, comando in comandos.items():
+        tempos = []
+        pesados = []
+        for _ in range(args.repeat):
+            if comando is None:
+                inicio = time.perf_counter()
+                subprocess.run([sys.executable, "-c", "pass"], check=True)
+                tempos.append(time.perf_counter() - inicio)
+            else:
+                tempo, pesados = _executar(comando, RAIZ)
+                tempos.append(tempo)
+        ms = 1000 * statistics.median(tempos)
+        resultados[nome] = {"ms": ms, "heavy_modules": pesados}
+        if comando and comando[0] in LIGHT_COMMANDS:
+            if pesados:
+                falhas.append(f"{nome} importou {', '.join(pesados)}")
+            if args.max_ms is not None and ms > args.max_ms:
+                falhas.append(f"{nome} levou {ms:.0f} ms (limite: {args.max_ms:.0f} ms)")
+
+    shutil.rmtree(saida, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"results": resultados, "failures": falhas}, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'comando':<32} {'ms (mediana)':>12}  módulos pesados")
+        for nome, r in resultados.items():
+            print(f"{nome:<32} {r['ms']:12.1f}  {', '.join(r['heavy_modules'] or []) or '-'}")
+        for falha in falhas:
+            print(f"FALHA: {falha}")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()